@@ -0,0 +1,31 @@
+# Copyright (C) 2023 IBM Corp.
+# SPDX-License-Identifier: Apache-2.0
+
+from ulkb import *
+
+from .profiler import Profiler
+
+a = BaseType('a')
+c = Constant('c', a)
+f = Constant('f', FunctionType(a, a, a))
+x = Variable('x', a)
+
+
+def nested_redex(n):
+    t = c
+    for _ in range(n):
+        t = Application(Abstraction(x, f(x, x)), t)
+    return t
+
+
+def main():
+    global t
+    t = nested_redex(10)
+    pf = Profiler(globals())
+    pf.timeit('BetaNormConv(t)', number=10)
+    pf.timeit('TopDepthConv(BetaConv)(t)', number=10)
+    # pf.profile(lambda: BetaNormConv(nested_redex(14)))
+
+
+if __name__ == '__main__':
+    main()
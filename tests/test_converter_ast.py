@@ -46,6 +46,19 @@ class TestConverterAST(ULKB_TestCase):
         })
         self.assert_deep_equal(s, Object.from_ast(ast))
 
+    def test_json_round_trip(self):
+        import json
+        a = BaseType('a')
+        x, y = Variable('x', a), Variable('y', a)
+        seq = RuleAssume(Equal(x, y))
+        ast = json.loads(json.dumps(seq.to_ast()))
+        self.assertIsInstance(ast['args'][0], list)  # hypotheses set
+        self.assert_deep_equal(seq, Sequent.from_ast(ast))
+        thy = Theory(NewTypeConstructor(a.head), load_prelude=False)
+        ast = json.loads(json.dumps(thy.to_ast()))
+        self.assertIsInstance(ast['args'], list)
+        self.assert_deep_equal(thy, Theory.from_ast(ast))
+
     def test_theory(self):
         ast = Theory.top.to_ast()
         self.assert_deep_equal(Theory.top, Theory.from_ast(ast))
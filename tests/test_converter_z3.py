@@ -4,6 +4,7 @@
 import z3
 
 from ulkb import *
+from ulkb.converter.z3 import ConverterZ3_Cache
 
 from .tests import ULKB_TestCase, main
 
@@ -44,6 +45,132 @@ class TestConverterZ3(ULKB_TestCase):
         self.assert_z3_is_false(Falsity().to_z3())
         self.assert_falsity(Constant.from_z3(z3.BoolVal(False)))
 
+    def test_convert_cache(self):
+        a = BaseType('a')
+        f = Constant('f', FunctionType(a, a, a))
+        c = Constant('c', a)
+        x, y = Variables('x', 'y', a)
+        t = f(f(c, c), f(c, c))
+        cache = ConverterZ3_Cache()
+        t_z3 = t.to_z3(cache=cache)
+        self.assertEqual(t_z3, f(f(c, c), f(c, c)).to_z3())
+        self.assertIs(t.to_z3(cache=cache), t_z3)
+        self.assertEqual(set(cache.decls), {f, c})
+        self.assertEqual(set(cache.sorts), {a, f.type})
+        self.assertEqual(set(cache.asts), {t, f(c, c), f, c})
+
+        # alpha-equivalent abstractions are defined once
+        g1 = Abstraction(x, f(x, c))
+        g2 = Abstraction(y, f(y, c))
+        g1_z3 = g1.to_z3(cache=cache)
+        self.assertIs(g2.to_z3(cache=cache), g1_z3)
+        self.assertEqual(g1_z3.name(), g1.to_z3().name())
+        self.assertNotEqual(
+            g1_z3.name(), Abstraction(x, f(c, x)).to_z3().name())
+
+        cache.clear()
+        self.assertEqual(len(cache.asts), 0)
+
+    def test_convert_theory_cache(self):
+        with Theory() as thy:
+            a = BaseType('a')
+            c = Constant('c', a)
+            self.assertNotIn(c, thy._get_z3().cache.decls)
+            c.to_z3()
+            self.assertNotIn(c, thy._get_z3().cache.decls)
+            thy.settings.converter.z3.theory_cache = True
+            c_z3 = c.to_z3()
+            self.assertIs(thy._get_z3().cache.decls[c], c_z3)
+            self.assertIs(c.to_z3(), c_z3)
+
+    def test_convert_quantifier(self):
+        A = z3.DeclareSort('A')
+        x, y = z3.Consts('x y', A)
+        f = z3.Function('f', A, A, A)
+        P = z3.Function('P', A, z3.BoolSort())
+        a = BaseType('A')
+        fc = Constant('f', FunctionType(a, a, a))
+        Pc = Constant('P', FunctionType(a, BoolType()))
+        xv, yv = Variables('x', 'y', a)
+        self.assertEqual(
+            Formula.from_z3(z3.ForAll([x, y], z3.Implies(
+                P(f(x, y)), z3.Exists([x], f(x, y) == x)))),
+            Forall(xv, yv, Implies(
+                Pc(fc(xv, yv)), Exists(xv, Equal(fc(xv, yv), xv)))))
+        # shadowed variables get fresh names
+        t = Formula.from_z3(z3.ForAll([x], z3.ForAll([x], P(x))))
+        self.assertEqual(t, Forall(xv, yv, Pc(yv)))
+        self.assertEqual(len(set(t.bound_variables)), 2)
+        self.assertEqual(
+            Term.from_z3(z3.Lambda([x], f(x, x))),
+            Abstraction(xv, fc(xv, xv)))
+        self.assertEqual(
+            Formula.from_z3(z3.ForAll([x], x == x)).to_z3(),
+            z3.ForAll([x], x == x))
+
+    def test_convert_from_dag(self):
+        A = z3.DeclareSort('A')
+        x, y, z = z3.Consts('x y z', A)
+        f = z3.Function('f', A, A, A)
+        a = BaseType('A')
+        fc, xc = Constant('f', FunctionType(a, a, a)), Constant('x', a)
+        t = x
+        for _ in range(60):     # 2^60 nodes if converted as a tree
+            t = f(t, t)
+        u = Term.from_z3(t)
+        for _ in range(60):     # sharing is preserved
+            g, l, r = u._unfold_application()
+            self.assertEqual(g, fc)
+            self.assertIs(l, r)
+            u = l
+        self.assertEqual(u, xc)
+        self.assertEqual(
+            Formula.from_z3(z3.Distinct(x, y, z)),
+            And(Not(Equal(xc, Constant('y', a))),
+                Not(Equal(xc, Constant('z', a))),
+                Not(Equal(Constant('y', a), Constant('z', a)))))
+        self.assertEqual(Type.from_z3(z3.IntSort()), IntType())
+        self.assertRaises(
+            ConverterError, Term.from_z3, z3.IntVal(1) + z3.IntVal(2))
+
+    def test_convert_simplify(self):
+        with Theory() as thy:
+            a = BaseType('a')
+            p, q = Constants('p', 'q', BoolType())
+            x, y = Variables('x', 'y', a)
+            f = Constant('f', FunctionType(a, a))
+            P = Constant('P', FunctionType(a, BoolType()))
+            self.assertEqual(
+                And(p, Truth(), q).to_z3(simplify=True), And(p, q))
+            # variables and abstractions are mapped back
+            t = And(P(y), Forall(x, Or(P(f(x)), Falsity())))
+            self.assertEqual(
+                t.to_z3(simplify=True), And(P(y), Forall(x, P(f(x)))))
+            g = Abstraction(x, f(x))
+            self.assertEqual(P(g(y)).to_z3(simplify=True), P(g(y)))
+            i = Variable('i', IntType())
+            self.assertEqual(
+                Not(gt_z(i, IntType.cast(3))).to_z3(simplify=True),
+                le_z(i, IntType.cast(3)))
+            self.assertEqual(
+                Or(p, And(Not(p), q)).to_z3(
+                    simplify=['simplify', 'ctx-simplify']),
+                Or(p, q))
+            self.assertRaises(
+                ConverterError, f(y).to_z3, simplify='ctx-simplify')
+            # results are cached by digest and tactic
+            simplified = thy._get_z3().simplified
+            n = len(simplified)
+            t.to_z3(simplify=True)
+            self.assertEqual(len(simplified), n)
+            t.to_z3(simplify='ctx-simplify')
+            self.assertEqual(len(simplified), n + 1)
+        with Theory() as thy:
+            thy.settings.converter.z3.simplify_cache_size = 1
+            And(p, q).to_z3(simplify=True)
+            Or(p, q).to_z3(simplify=True)
+            self.assertEqual(len(thy._get_z3().simplified), 1)
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,87 @@
+# Copyright (C) 2023 IBM Corp.
+# SPDX-License-Identifier: Apache-2.0
+
+from ulkb import *
+
+from .tests import ULKB_TestCase, main
+
+
+class TestSInE(ULKB_TestCase):
+
+    def setUp(self):
+        self.thy = Theory()
+        Theory.push(self.thy)
+        a = new_base_type('a')
+        self.c, self.d, self.e = map(lambda x: new_constant(x, a), 'cde')
+        self.P = new_constant('P', FunctionType(a, bool))
+        self.Q = new_constant('Q', FunctionType(a, bool))
+        R = new_constant('R', FunctionType(a, bool))
+        self.x = Variable('x', a)
+        for i in range(10):
+            k = new_constant(f'k{i}', a)
+            new_axiom(f'noise{i}', Or(R(k), self.Q(k)))
+        new_axiom('ax1', Forall(
+            self.x, Implies(self.P(self.x), self.Q(self.x))))
+        new_axiom('ax2', self.P(self.c))
+        new_axiom('ax3', Equal(self.c, self.d))
+
+    def tearDown(self):
+        Theory.pop()
+
+    def ids(self, axioms):
+        return [ax.id for ax in axioms]
+
+    def test_sine_select(self):
+        P, Q, c, d, e = self.P, self.Q, self.c, self.d, self.e
+        sine = SInE()
+        # d triggers ax3; c triggers ax2 (P is more general than c);
+        # P triggers ax1 (Q is more general than P)
+        self.assertEqual(self.ids(sine.select(Q(d))), ['ax1', 'ax2', 'ax3'])
+        self.assertEqual(self.ids(sine.select(Q(d), depth=1)), ['ax3'])
+        self.assertEqual(self.ids(sine.select(Q(d), depth=2)), ['ax2', 'ax3'])
+        self.assertEqual(len(sine.select(Q(d), tolerance=10)), 3)
+        self.assertEqual(len(sine.select(Q(d), tolerance=11)), 13)
+        self.assertEqual(sine.select(Q(e)), [])
+        self.assertEqual(sine.select(Truth()), [])
+        self.assertRaises(TypeError, sine.select, c)
+        self.assertRaises(ValueError, SInE, tolerance=.5)
+
+        # the index follows theory
+        new_axiom('ax4', P(e))
+        self.assertEqual(
+            self.ids(sine.select(P(e), depth=1)), ['ax1', 'ax4'])
+        reset('ax4')           # P is now less general
+        self.assertEqual(
+            self.ids(sine.select(P(e), depth=1)), ['ax1', 'ax2'])
+        with Theory() as thy:
+            self.assertEqual(sine.select(P(e), theory=thy), [])
+        self.assertEqual(
+            self.ids(sine.select(P(e), depth=1)), ['ax1', 'ax2'])
+
+    def test_sine_widen(self):
+        Q, d = self.Q, self.d
+        sine = SInE(depth=1)
+        self.assertEqual(sine.schedule, ((2, 1.5), (None, 2.0)))
+        self.assertEqual(
+            list(map(self.ids, sine.widen(Q(d)))),
+            [['ax3'], ['ax2', 'ax3'], ['ax1', 'ax2', 'ax3']])
+        # selections with all axioms are skipped
+        sine = SInE(depth=1, schedule=[(1, 1), (2, 1), (None, 11)])
+        self.assertEqual(
+            list(map(self.ids, sine.widen(Q(d)))), [['ax3'], ['ax2', 'ax3']])
+
+    def test_sine_rule_z3(self):
+        P, Q, c, d = self.P, self.Q, self.c, self.d
+        sine = SInE(depth=1)
+        seq = RuleZ3(Q(d), premise_selection=sine)
+        self.assert_sequent(seq, (frozenset(), Q(d)))
+        self.assertEqual(
+            set(seq.proof.args[1]._unfold_and()), {
+                Forall(self.x, Implies(P(self.x), Q(self.x))),
+                P(c), Equal(c, d)})
+        self.assertRaises(
+            RuleError, RuleZ3, Q(self.e), premise_selection=sine)
+
+
+if __name__ == '__main__':
+    main()
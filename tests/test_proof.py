@@ -0,0 +1,213 @@
+# Copyright (C) 2023 IBM Corp.
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+import json
+import pathlib
+import tempfile
+
+from ulkb import *
+from ulkb.rule import RuleAxiom
+
+from .tests import ULKB_TestCase, main
+
+
+class TestProof(ULKB_TestCase):
+
+    def test_proof(self):
+        with Theory() as thy:
+            a = BaseType('a')
+            x, y = Variables('x', 'y', a)
+            seq = RuleRefl(x)
+            self.assertEqual(seq.proof.rule, 'RuleRefl')
+            self.assertEqual(seq.proof.args, (x,))
+            self.assertEqual(seq.proof.premises, ())
+            self.assertIs(seq.proof.store, thy.proofs)
+            n = len(thy.proofs)
+            self.assertEqual(RuleRefl(x).proof, seq.proof)  # interned
+            self.assertEqual(len(thy.proofs), n)
+            seq = RuleTrans(seq, seq)
+            self.assertEqual(seq.proof.args, (None, None))
+            self.assertEqual(
+                seq.proof.premises, (RuleRefl(x).proof,) * 2)
+            seq = RuleSubst({x: y}, seq)
+            self.assertEqual(seq.proof.args, ({x: y}, None))
+            self.assertEqual(RuleSubst({x: y}, RuleTrans(
+                RuleRefl(x), RuleRefl(x))).proof, seq.proof)
+            self.assertEqual(len(thy.proofs), n + 2)
+            self.assertEqual(seq.proof.to_tuple(), (
+                'RuleSubst', {x: y}, (
+                    'RuleTrans', ('RuleRefl', x), ('RuleRefl', x))))
+
+    def test_proof_sharing(self):
+        with Theory():
+            seq = RuleRefl(Variable('x', BaseType('a')))
+            for _ in range(64):
+                seq = RuleTrans(seq, seq)
+            self.assertEqual(seq.proof.id - RuleRefl(seq[1][1]).proof.id, 64)
+            t = seq.proof.to_tuple()
+            self.assertIs(t[1], t[2])
+
+    def test_proof_lazy(self):
+        import gc
+        with Theory() as thy:
+            a = BaseType('a')
+            n = len(thy.proofs)
+            for i in range(100):
+                RuleRefl(Variable(f'x{i}', a))
+            gc.collect()
+            self.assertEqual(len(thy.proofs), n)  # not requested
+            seq = RuleRefl(Variable('x', a))
+            for _ in range(8):
+                seq = RuleTrans(seq, seq)
+            self.assertIs(seq.proof.store, thy.proofs)
+            self.assertEqual(len(thy.proofs), n + 9)
+            self.assertEqual(seq.proof.premises[0].rule, 'RuleTrans')
+        with Theory() as thy:
+            thy.freeze()
+            seq = RuleRefl(Variable('x', BaseType('a')))
+            self.assertIsNone(thy._proofs)  # not written to
+            self.assertEqual(seq.proof.rule, 'RuleRefl')
+
+    def test_proof_not_recorded(self):
+        with Theory() as thy:
+            thy.settings.record_proofs = False
+            seq = RuleRefl(Variable('x', BaseType('a')))
+            self.assertIsNone(seq.proof)
+            thy.settings.record_proofs = True
+            self.assertIsNone(RuleTrans(seq, seq).proof)
+
+    def test_proof_import(self):
+        with Theory():
+            seq = RuleRefl(Variable('x', BaseType('a')))
+        with Theory() as thy:
+            seq = RuleTrans(seq, seq)
+            self.assertIs(seq.proof.store, thy.proofs)
+            self.assertEqual(seq.proof.premises[0].rule, 'RuleRefl')
+
+    def test_to_jsonl(self):
+        with Theory() as thy:
+            a = BaseType('a')
+            x, y = Variables('x', 'y', a)
+            seq = RuleSubst({x: y}, RuleTrans(RuleRefl(x), RuleRefl(x)))
+            fp = io.StringIO()
+            self.assertEqual(seq.proof.to_jsonl(fp), 3)
+            nodes = list(map(json.loads, fp.getvalue().splitlines()))
+            x_ast, y_ast = map(
+                lambda v: json.loads(json.dumps(v.to_ast())), (x, y))
+            self.assertEqual(
+                list(map(lambda x: x['rule'], nodes)),
+                ['RuleRefl', 'RuleTrans', 'RuleSubst'])
+            self.assertEqual(nodes[0]['args'], [x_ast])
+            self.assertEqual(nodes[1]['premises'], [nodes[0]['id']] * 2)
+            self.assertEqual(
+                nodes[2]['args'], [[[x_ast, y_ast]], None])
+            self.assertEqual(
+                Variable.from_ast(nodes[0]['args'][0]), x)
+            fp = io.StringIO()
+            self.assertEqual(thy.proofs.to_jsonl(fp), len(thy.proofs))
+
+    def mk_proofs(self):
+        a = BaseType('a')
+        x, y = Variables('x', 'y', a)
+        seqs = [RuleRefl(x)]
+        for _ in range(4):
+            seqs.append(RuleTrans(seqs[-1], seqs[-1]))
+        seqs.append(RuleSubst({x: y}, seqs[-1]))
+        seqs.append(RuleAbs(y, seqs[-1]))
+        defn = Theory.top.lookup_definition('true')
+        seqs.append(RuleTrans(defn, RuleRefl(defn[1].right)))
+        return seqs
+
+    def test_replay(self):
+        with Theory() as thy:
+            seqs = self.mk_proofs()
+            self.assertEqual(
+                thy.proofs.replay(*map(lambda x: x.proof, seqs)), seqs)
+            self.assertEqual(seqs[-2].proof.replay(), seqs[-2])
+            self.assertTrue(thy.proofs.check(*seqs))
+            n = len(thy.proofs._replayed)
+            thy.proofs.check(*seqs)
+            self.assertEqual(len(thy.proofs._replayed), n)  # cached
+
+    def test_replay_parallel(self):
+        with Theory() as thy:
+            seqs = self.mk_proofs()
+            self.assertTrue(thy.proofs.check(*seqs, processes=2))
+            self.assertEqual(thy.proofs.replay(
+                *map(lambda x: x.proof, seqs), processes=2), seqs)
+
+    def test_replay_parallel_split(self):
+        with Theory() as thy:
+            a = BaseType('a')
+            seqs = [RuleRefl(Variable(f'x{i}', a)) for i in range(16)]
+            while len(seqs) > 1:
+                seqs = [RuleConj(seqs[i], seqs[i + 1])
+                        for i in range(0, len(seqs), 2)]
+            (seq,) = seqs
+            # the single proof is cut into subproofs of 3 nodes or more
+            waves = thy.proofs._get_replay_waves([seq.proof.id], 2)
+            self.assertEqual(list(map(len, waves)), [8, 2, 1])
+            self.assertEqual(waves[-1], [seq.proof.id])
+            self.assertTrue(thy.proofs.check(seq, processes=2))
+            self.assertEqual(thy.proofs._get_replay_waves(
+                [seq.proof.id], 2), [])
+
+    def test_replay_errors(self):
+        with Theory() as thy:
+            a = BaseType('a')
+            x, y = Variables('x', 'y', a)
+            bad = thy.proofs.add(RuleTrans, (RuleRefl(x), RuleRefl(y)))
+            for processes in (None, 2):
+                self.assertRaisesRegex(
+                    ProofError, f'proof node {bad.id}: RuleTrans',
+                    thy.proofs.replay, bad, processes=processes)
+            bad = thy.proofs.add(RuleAxiom, (Equal(x, y),))
+            self.assertRaisesRegex(
+                ProofError, 'no such axiom', bad.replay)
+            seq = RuleAxiom(Falsity())
+            self.assertRaisesRegex(
+                ProofError, 'no such axiom', thy.proofs.check, seq)
+            thy.settings.record_proofs = False
+            seq = RuleRefl(x)
+            thy.settings.record_proofs = True
+            self.assertRaisesRegex(
+                ProofError, 'no proof', thy.proofs.check, seq)
+
+    def test_store_on_disk(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / 'proofs.db'
+            with Theory() as thy:
+                self.assertIsNone(thy.proofs.path)
+                thy.settings.proof_store_path = path
+                store = thy.proofs
+                self.assertEqual(store.path, path)
+                self.assertEqual(len(store), 0)
+                store._nodes.maxsize = 2
+                store._ids.maxsize = 2
+                seqs = self.mk_proofs()
+                n = len(store)
+                self.assertEqual(n, 10)
+                self.assertEqual(len(store._nodes), 2)
+                self.assertEqual(self.mk_proofs(), seqs)
+                self.assertEqual(len(store), n)  # interned
+                self.assertEqual(
+                    seqs[-2].proof.to_tuple()[0], 'RuleAbs')
+                self.assertEqual(seqs[-2].proof.args[0], Variable(
+                    'y', BaseType('a')))
+                self.assertTrue(store.check(*seqs))
+                store.close()
+                thy.settings.proof_store_path = None
+                self.assertIsNot(thy.proofs, store)
+            store = ProofStore(path)
+            self.assertEqual(len(store), n)
+            self.assertEqual(store[seqs[-2].proof.id], (
+                'RuleAbs', (Variable('y', BaseType('a')), None),
+                (seqs[-3].proof.id,)))
+            fp = io.StringIO()
+            self.assertEqual(store.to_jsonl(fp), n)
+            store.close()
+
+
+if __name__ == '__main__':
+    main()
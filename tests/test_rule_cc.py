@@ -0,0 +1,66 @@
+# Copyright (C) 2023 IBM Corp.
+# SPDX-License-Identifier: Apache-2.0
+
+from ulkb import *
+from ulkb.rule import RuleAxiom
+
+from .tests import ULKB_TestCase, main
+
+
+class TestRuleCC(ULKB_TestCase):
+
+    def test_rule_cc(self):
+        a = BaseType('a')
+        f = Constant('f', FunctionType(a, a))
+        g = Constant('g', FunctionType(a, a, a))
+        c, d, e = Constants('c', 'd', 'e', a)
+        p = Constant('p', bool)
+
+        self.assertRaises(TypeError, RuleCC, 0)
+        self.assertRaises(TypeError, RuleCC, Equal(c, c), 0)
+        self.assertRaises(RuleError, RuleCC, p)
+        self.assertRaises(RuleError, RuleCC, Equal(c, c), RuleAssume(p))
+
+        self.assert_sequent(RuleCC(Equal(c, c)), (set(), Equal(c, c)))
+        self.assertRaisesRegex(
+            RuleError, 'failed to prove', RuleCC, Equal(c, d))
+
+        def fn(n, t):
+            for _ in range(n):
+                t = f(t)
+            return t
+        seq1 = RuleAssume(Equal(fn(3, c), c))
+        seq2 = RuleAssume(Equal(fn(5, c), c))
+        seq = RuleCC(Equal(f(c), c), seq1, seq2)
+        self.assert_sequent(
+            seq, ({seq1.conclusion, seq2.conclusion}, Equal(f(c), c)))
+        self.assertTrue(seq.is_rule_cc())
+
+        seq3 = RuleAssume(Equal(c, d))
+        seq4 = RuleAssume(Equal(d, e))
+        seq = RuleCC(Equal(g(c, e), g(e, c)), seq1, seq3, seq4)
+        self.assert_sequent(
+            seq, ({seq3.conclusion, seq4.conclusion},
+                  Equal(g(c, e), g(e, c))))
+        self.assertRaisesRegex(
+            RuleError, 'failed to prove',
+            RuleCC, Equal(g(c, e), f(c)), seq1, seq3, seq4)
+
+        # bool equations
+        q = Constant('q', bool)
+        h = Constant('h', FunctionType(bool, a))
+        seq = RuleCC(Equal(h(p), h(q)), RuleAssume(Iff(p, q)))
+        self.assert_sequent(seq, ({Iff(p, q)}, Equal(h(p), h(q))))
+
+    def test_rule_cc_chain(self):
+        a = BaseType('a')
+        f = Constant('f', FunctionType(a, a))
+        cs = [Constant(f'c{i}', a) for i in range(1000)]
+        seqs = [
+            RuleAxiom(Equal(cs[i], cs[i + 1])) for i in range(len(cs) - 1)]
+        seq = RuleCC(Equal(f(cs[-1]), f(cs[0])), *reversed(seqs))
+        self.assert_sequent(seq, (set(), Equal(f(cs[-1]), f(cs[0]))))
+
+
+if __name__ == '__main__':
+    main()
@@ -346,6 +346,107 @@ class TestRuleDerived(ULKB_TestCase):
         self.assertFalse(seq.is_rule_eq_truth_intro())
         self.assertTrue(seq.is_rule_eq_truth_elim())
 
+    def test_conversion_then_or_else(self):
+        a = BaseType('a')
+        c = Constant('c', a)
+        conv = PassConv
+        for _ in range(5000):
+            conv = conv >> PassConv
+        self.assertEqual(conv(c).conclusion, Equal(c, c))
+        conv = FailConv
+        for _ in range(5000):
+            conv = conv | FailConv
+        self.assertRaises(RuleError, conv, c)
+        self.assertEqual((conv | PassConv)(c).conclusion, Equal(c, c))
+        self.assertEqual(
+            FailConv.or_else(FailConv, PassConv)(c).conclusion, Equal(c, c))
+
+    def test_conversion_repeat(self):
+        a = BaseType('a')
+        c = Constant('c', a)
+        f = Constant('f', FunctionType(a, a))
+        z = Variable('z', a)
+        t = c
+        for _ in range(3):
+            t = Application(Abstraction(z, f(z)), t)
+        seq = BetaConv.repeat(t)
+        self.assertEqual(seq.conclusion, Equal(t, f(t.right)))
+        self.assertEqual(PassConv.repeat(c).conclusion, Equal(c, c))
+        self.assertEqual(FailConv.repeat(c).conclusion, Equal(c, c))
+
+    def test_sub_conv(self):
+        a = BaseType('a')
+        c = Constant('c', a)
+        f = Constant('f', FunctionType(a, a))
+        z = Variable('z', a)
+        r = Application(Abstraction(z, f(z)), c)
+        seq = SubConv(BetaConv.try_)(f(r))
+        self.assertEqual(seq.conclusion, Equal(f(r), f(f(c))))
+        seq = SubConv(BetaConv.try_)(Abstraction(z, r))
+        self.assertEqual(
+            seq.conclusion, Equal(Abstraction(z, r), Abstraction(z, f(c))))
+        self.assertEqual(SubConv(FailConv)(c).conclusion, Equal(c, c))
+        self.assertRaises(RuleError, SubConv(FailConv), f(c))
+
+    def test_once_depth_conv(self):
+        a = BaseType('a')
+        c = Constant('c', a)
+        f = Constant('f', FunctionType(a, a))
+        g = Constant('g', FunctionType(a, a, a))
+        z = Variable('z', a)
+        r = Application(Abstraction(z, f(z)), c)
+        rr = Application(Abstraction(z, f(z)), r)
+        seq = OnceDepthConv(BetaConv)(g(rr, r))
+        self.assertEqual(seq.conclusion, Equal(g(rr, r), g(f(r), f(c))))
+        self.assertEqual(OnceDepthConv(FailConv)(r).conclusion, Equal(r, r))
+
+    def test_top_depth_conv(self):
+        a = BaseType('a')
+        c = Constant('c', a)
+        f = Constant('f', FunctionType(a, a))
+        g = Constant('g', FunctionType(a, a, a))
+        z = Variable('z', a)
+        t = c
+        for _ in range(150):
+            t = Application(Abstraction(z, f(z)), t)
+        u = c
+        for _ in range(150):
+            u = f(u)
+        self.assertEqual(TopDepthConv(BetaConv)(t).conclusion, Equal(t, u))
+        t = Abstraction(z, Application(Abstraction(z, f(z)), z))
+        self.assertEqual(
+            TopDepthConv(BetaConv)(t).conclusion,
+            Equal(t, Abstraction(z, f(z))))
+        # shared subterms are converted once per pass
+        hits = []
+
+        def beta(t):
+            seq = RuleBeta(t)
+            hits.append(t)
+            return seq
+        r = Application(Abstraction(z, f(z)), c)
+        seq = TopDepthConv(Conversion(beta))(g(r, r))
+        self.assertEqual(seq.conclusion, Equal(g(r, r), g(f(c), f(c))))
+        self.assertEqual(hits, [r])
+
+    def test_beta_norm_conv(self):
+        a = BaseType('a')
+        c = Constant('c', a)
+        f = Constant('f', FunctionType(a, a, a))
+        x, y = Variables('x', 'y', a)
+        F = Variable('F', FunctionType(a, a))
+        self.assertEqual(BetaNormConv(c).conclusion, Equal(c, c))
+        t = Application(Abstraction(F, x, F(F(x))), Abstraction(y, f(y, y)))
+        self.assertEqual(
+            BetaNormConv(t).conclusion,
+            Equal(t, Abstraction(x, f(f(x, x), f(x, x)))))
+        t = c
+        for _ in range(8):
+            t = Application(Abstraction(x, f(x, x)), t)
+        seq = BetaNormConv(t)
+        self.assertEqual(seq, TopDepthConv(BetaConv)(t))
+        self.assertFalse(seq.conclusion.right.is_beta_redex())
+
 
 if __name__ == '__main__':
     main()
@@ -1,6 +1,8 @@
 # Copyright (C) 2023 IBM Corp.
 # SPDX-License-Identifier: Apache-2.0
 
+from unittest.mock import patch
+
 from ulkb import *
 
 from .tests import ULKB_TestCase, main
@@ -36,6 +38,81 @@ class TestRuleE(ULKB_TestCase):
         # self.assertRaisesRegex(
         #     RuleError, 'failed to prove', RuleE, lt_z(4, 3))
 
+    def test_rule_e_premise_selection(self):
+        with Theory() as thy:
+            a = new_base_type('a')
+            c, d = new_constant('c', a), new_constant('d', a)
+            P = new_constant('P', FunctionType(a, bool))
+            Q = new_constant('Q', FunctionType(a, bool))
+            new_axiom('ax1', Q(d))
+            new_axiom('ax2', P(c))
+            new_axiom('ax3', Equal(c, d))
+            problems = []
+
+            def run(settings, hyps, conj_tptp):
+                problems.append(hyps)
+                return False
+
+            with patch.object(RuleE, '_run', side_effect=run):
+                self.assertRaises(
+                    RuleError, RuleE, P(d), premise_selection=SInE(depth=1))
+            # reduced problem, then full problem
+            path = thy._get_tptp().file.name
+            self.assertEqual(problems, [
+                'fof(ax2,axiom,cP(cc)).\nfof(ax3,axiom,(cc = cd)).',
+                f"include('{path}').\n"])
+
+    def test_rule_e_axiom_file(self):
+        with Theory() as thy:
+            a = new_base_type('a')
+            c, d = new_constant('c', a), new_constant('d', a)
+            P = new_constant('P', FunctionType(a, bool))
+            problems = []
+
+            def run(settings, hyps, conj_tptp):
+                problems.append(hyps)
+                return True
+
+            def read_axiom_file():
+                with open(thy._get_tptp().file.name) as fp:
+                    return fp.read()
+
+            with patch.object(RuleE, '_run', side_effect=run):
+                RuleE(P(c))
+                self.assertEqual(problems, [''])
+                new_axiom('ax1', P(d))
+                new_axiom('ax2', Equal(c, d))
+                RuleE(P(c))
+                path = thy._get_tptp().file.name
+                self.assertEqual(problems[1], f"include('{path}').\n")
+                self.assertEqual(
+                    read_axiom_file(),
+                    'fof(ax1,axiom,cP(cd)).\nfof(ax2,axiom,(cc = cd)).\n')
+
+                # new axioms are appended from cached texts
+                texts = thy._get_tptp().texts
+                ax1 = lookup_extension('ax1')
+                texts[ax1.hexdigest] = 'fof(ax1,axiom,$true).'
+                new_axiom('ax3', P(c))
+                RuleE(P(c))
+                self.assertEqual(
+                    read_axiom_file(),
+                    'fof(ax1,axiom,cP(cd)).\nfof(ax2,axiom,(cc = cd)).\n'
+                    'fof(ax3,axiom,cP(cc)).\n')
+                self.assertEqual(
+                    thy.to_tptp(), 'fof(ax1,axiom,$true).\n'
+                    'fof(ax2,axiom,(cc = cd)).\nfof(ax3,axiom,cP(cc)).')
+
+                # reset rewrites the file
+                reset('ax2')
+                RuleE(P(c))
+                self.assertEqual(
+                    read_axiom_file(), 'fof(ax1,axiom,$true).\n')
+                self.assertEqual(thy._get_tptp().file.name, path)
+                reset('ax1')
+                RuleE(P(c))
+                self.assertEqual(problems[-1], '')
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,88 @@
+# Copyright (C) 2023 IBM Corp.
+# SPDX-License-Identifier: Apache-2.0
+
+from ulkb import *
+
+from .tests import ULKB_TestCase, main
+
+
+class TestRuleRewrite(ULKB_TestCase):
+
+    def setUp(self):
+        Theory.push(Theory())
+        self.a = new_base_type('a')
+        self.f = new_constant('f', FunctionType(self.a, self.a))
+        self.g = new_constant('g', FunctionType(self.a, self.a))
+        self.c = new_constant('c', self.a)
+        self.x = Variable('x', self.a)
+        self.z = Variable('z', self.a)
+
+    def tearDown(self):
+        Theory.pop()
+
+    def test_rewrite_conv(self):
+        a, f, g, c, x, z = self.a, self.f, self.g, self.c, self.x, self.z
+        self.assertRaises(TypeError, RewriteConv, [0])
+        self.assertRaises(RuleError, RewriteConv, [RuleRefl(x)])
+
+        ax = new_axiom(Equal(f(x), g(x)))
+        conv = RewriteConv([ax])
+        self.assertEqual(conv(f(f(c))).conclusion, Equal(f(f(c)), g(g(c))))
+        self.assertEqual(conv(c).conclusion, Equal(c, c))
+        self.assertEqual(conv.stats['rules'], 1)
+        self.assertEqual(conv.stats['rewrites'], 2)
+
+        # under binders
+        t = Abstraction(z, f(z))
+        self.assertEqual(
+            conv(t).conclusion, Equal(t, Abstraction(z, g(z))))
+
+        # hypotheses fix their variables
+        conv = RewriteConv([RuleAssume(Equal(f(x), g(x)))])
+        seq = conv(f(f(x)))
+        self.assertEqual(seq.hypotheses, {Equal(f(x), g(x))})
+        self.assertEqual(seq.conclusion, Equal(f(f(x)), f(g(x))))
+
+        # non-equational theorems
+        p = new_constant('p', FunctionType(a, bool))
+        conv = RewriteConv([new_axiom(p(x))])
+        self.assertEqual(
+            conv(And(p(c), p(z))).conclusion,
+            Iff(And(p(c), p(z)), And(Truth(), Truth())))
+
+    def test_rewrite_conv_type_instantiation(self):
+        f, g, x, z = self.f, self.g, self.x, self.z
+        b = TypeVariable('b')
+        k = new_constant('k', FunctionType(b, b))
+        y = Variable('y', b)
+        conv = RewriteConv([
+            new_axiom(Equal(f(x), g(x))), new_axiom(Equal(k(y), y))])
+        t = Abstraction(z, g(k(f(k(z)))))
+        self.assertEqual(
+            conv(t).conclusion, Equal(t, Abstraction(z, g(g(z)))))
+        self.assertEqual(conv.stats['rewrites'], 3)
+        t = k(Abstraction(z, z))
+        self.assertEqual(conv(t).conclusion, Equal(t, Abstraction(z, z)))
+
+    def test_rewrite_conv_higher_order(self):
+        x, y = Variables('x', 'y', bool)
+        P = Variable('P', FunctionType(bool, bool))
+        conv = RewriteConv([new_axiom(Equal(Exists(y, P(y)), P(Truth())))])
+        t = And(Exists(y, Or(y, x)), Truth())
+        self.assertEqual(
+            conv(t).conclusion, Iff(t, And(Or(Truth(), x), Truth())))
+
+    def test_rewrite_conv_index(self):
+        a, f, g, c = self.a, self.f, self.g, self.c
+        cs = [new_constant(f'c{i}', a) for i in range(2000)]
+        conv = RewriteConv([new_axiom(Equal(f(ci), c)) for ci in cs])
+        t = g(f(cs[1000]))
+        self.assertEqual(conv(t).conclusion, Equal(t, g(c)))
+        stats = conv.stats
+        self.assertEqual(stats['rules'], 2000)
+        self.assertEqual(stats['rewrites'], 1)
+        self.assertEqual(stats['candidates'], 1)
+
+
+if __name__ == '__main__':
+    main()
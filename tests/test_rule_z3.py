@@ -1,6 +1,8 @@
 # Copyright (C) 2023 IBM Corp.
 # SPDX-License-Identifier: Apache-2.0
 
+from unittest.mock import patch
+
 from ulkb import *
 
 from .tests import ULKB_TestCase, main
@@ -36,6 +38,146 @@ class TestRuleZ3(ULKB_TestCase):
         self.assertRaisesRegex(
             RuleError, 'failed to prove', RuleZ3, lt_z(4, 3))
 
+    def test_rule_z3_incremental(self):
+        with Theory() as thy:
+            a = new_base_type('a')
+            c, d = new_constant('c', a), new_constant('d', a)
+            P = new_constant('P', FunctionType(a, bool))
+            solver = thy.z3_solver
+            self.assertIs(thy.z3_solver, solver)
+            self.assertEqual(len(solver.assertions()), 0)
+            self.assertRaises(RuleError, RuleZ3, P(c))
+            new_axiom('ax1', P(d))
+            self.assertRaises(RuleError, RuleZ3, P(c))
+            new_axiom('ax2', Equal(c, d))
+            self.assert_sequent(RuleZ3(P(c)), (frozenset(), P(c)))
+            self.assertEqual(len(solver.assertions()), 2)
+            self.assertEqual(solver.num_scopes(), 2)
+
+            # goals do not leak into the solver
+            self.assert_sequent(RuleZ3(P(d)), (frozenset(), P(d)))
+            self.assertEqual(len(solver.assertions()), 2)
+
+            # reset pops the scopes of removed axioms
+            reset('ax2')
+            self.assertRaises(RuleError, RuleZ3, P(c))
+            self.assertEqual(len(solver.assertions()), 1)
+            self.assertEqual(solver.num_scopes(), 1)
+
+            # replacing an extension is detected by its digest
+            reset('ax1')
+            new_axiom('ax1', Equal(c, d))
+            self.assertRaises(RuleError, RuleZ3, P(c))
+            self.assertEqual(len(solver.assertions()), 1)
+            self.assert_sequent(
+                RuleZ3(Equal(d, c)), (frozenset(), Equal(d, c)))
+
+    def test_entails_many(self):
+        with Theory() as thy:
+            a = new_base_type('a')
+            c, d, e = map(lambda x: new_constant(x, a), 'cde')
+            P = new_constant('P', FunctionType(a, bool))
+            new_axiom('ax1', P(d))
+            new_axiom('ax2', Equal(c, d))
+            x = Variable('x', a)
+            goals = [P(c), P(e), Exists(x, P(x)), Not(P(c)), Equal(d, c)]
+            expected = [True, None, True, False, True]
+            for processes in (None, 2):
+                res = thy.entails_many(goals, processes=processes)
+                self.assertEqual([r for r, _ in res], expected)
+                self.assertTrue(all(t >= 0 for _, t in res))
+            self.assertEqual(thy.entails_many([]), [])
+            self.assertRaises(TypeError, thy.entails_many, [a])
+            self.assertRaises(TypeError, thy.entails_many, [c])
+
+            # goals do not leak into the solver
+            self.assertEqual(len(thy.z3_solver.assertions()), 2)
+            self.assertEqual(thy.z3_solver.num_scopes(), 1)
+            new_axiom('ax3', P(e))
+            self.assertEqual(
+                [r for r, _ in thy.entails_many(goals, timeout=1000)],
+                [True, True, True, False, True])
+
+    def test_rule_z3_threads(self):
+        import threading
+        thy = Theory()
+        a = thy.new_base_type('a')
+        c, d, e = map(lambda x: thy.new_constant(x, a), 'cde')
+        P = thy.new_constant('P', FunctionType(a, bool))
+        thy.new_axiom('ax1', P(d))
+        thy.new_axiom('ax2', Equal(c, d))
+        thy.freeze()
+        goals = [(P(c), True), (P(e), False), (Not(P(c)), False)]
+        errors = []
+
+        def f():
+            with thy:
+                for _ in range(20):
+                    for goal, provable in goals:
+                        try:
+                            RuleZ3(goal)
+                            ok = provable
+                        except RuleError:
+                            ok = not provable
+                        except Exception as err:
+                            ok = False
+                            errors.append(err)
+                        if not ok:
+                            errors.append(goal)
+                    try:
+                        res = [r for r, _ in thy.entails_many(
+                            [goal for goal, _ in goals])]
+                    except Exception as err:
+                        res = [err]
+                    if res != [True, None, False]:
+                        errors.append(res)
+        ts = [threading.Thread(target=f) for _ in range(4)]
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+        self.assertEqual(errors, [])
+
+    def test_rule_z3_core(self):
+        with Theory() as thy:
+            a = new_base_type('a')
+            c, d, e = map(lambda x: new_constant(x, a), 'cde')
+            P = new_constant('P', FunctionType(a, bool))
+            Q = new_constant('Q', FunctionType(a, bool))
+            for i in range(10):
+                new_axiom(Q(e) if i % 2 else Implies(P(d), Q(c)))
+            new_axiom('ax1', P(d))
+            new_axiom('ax2', Equal(c, d))
+            seq = RuleZ3(P(c))
+            self.assertEqual(seq.proof.args, (P(c), And(P(d), Equal(c, d))))
+            z = thy._get_z3()
+            self.assertEqual(
+                z.cores[(P(c).hexdigest, thy.hexdigest)],
+                (P(d), Equal(c, d)))
+
+            # cached and recorded cores skip the full check
+            with patch.object(type(z), 'get_core', side_effect=Exception):
+                self.assertEqual(RuleZ3(P(c)), seq)
+                self.assertEqual(
+                    RuleZ3(Equal(d, c)).proof.args[1], Equal(c, d))
+                self.assertEqual(thy.proofs.replay(seq.proof), [seq])
+                self.assertEqual(
+                    RuleZ3(Q(c), And(Implies(P(d), Q(c)), P(d))).proof.args,
+                    (Q(c), And(Implies(P(d), Q(c)), P(d))))
+                self.assertEqual(
+                    RuleZ3(Equal(c, c), Truth()).proof.args[1], Truth())
+            seq = RuleZ3(Q(c))
+            self.assertEqual(
+                seq.proof.args, (Q(c), And(Implies(P(d), Q(c)), P(d))))
+
+            # cores must consist of axioms
+            self.assertRaises(RuleError, RuleZ3, P(e), P(e))
+            self.assertRaises(TypeError, RuleZ3, P(e), e)
+            reset('ax1')
+            self.assertRaises(RuleError, RuleZ3, P(c))
+            self.assertRaises(
+                RuleError, RuleZ3, P(c), And(P(d), Equal(c, d)))
+
 
 if __name__ == '__main__':
     main()
@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
 from ulkb import *
+from ulkb.rule import RuleAxiom
 from ulkb.sequent import _Sequent
 
 from .tests import ULKB_TestCase, main
@@ -26,6 +27,96 @@ class TestSequent(ULKB_TestCase):
         seq = self.mk_sequent({x, x, y, x}, y, i=1, j=2)
         self.assert_sequent(seq, (frozenset({x, y}), y), {'i': 1, 'j': 2})
 
+    def test_sequent_hypotheses_sharing(self):
+        a = TypeVariable('a')
+        x, y, z = Variables('x', 'y', 'z', a)
+        s1 = RuleAssume(Equal(x, y))
+        s2 = RuleAssume(Equal(y, z))
+        seq = RuleTrans(s1, RuleRefl(y))
+        self.assertIs(seq.hypotheses, s1.hypotheses)
+        seq = RuleTrans(RuleRefl(x), s1)
+        self.assertIs(seq.hypotheses, s1.hypotheses)
+        seq = RuleTrans(s1, s2)
+        self.assertEqual(seq.hypotheses, {Equal(x, y), Equal(y, z)})
+        s3 = RuleAssume(Equal(x, x))
+        self.assertIs(RuleTrans(s3, s3).hypotheses, s3.hypotheses)
+        seq = RuleDeductAntisym(RuleAssume(x@bool), RuleAssume(y@bool))
+        self.assertEqual(seq.hypotheses, {x@bool, y@bool})
+        seq = RuleDeductAntisym(s1, RuleRefl(x))
+        self.assertIs(seq.hypotheses, s1.hypotheses)
+        # unvalidated sets are still checked
+        self.assertRaises(
+            TypeError, self.mk_sequent, s1.hypotheses | {x}, x@bool)
+
+    def test_sequent_hypotheses_variables(self):
+        a, b = TypeVariables('a', 'b')
+        x, y, z = Variables('x', 'y', 'z', a)
+        k = Variable('k', b)
+        seq = RuleTrans(RuleAssume(Equal(x, y)), RuleAssume(Equal(y, z)))
+        self.assertEqual(seq.hypotheses_free_variables, {x, y, z})
+        self.assertEqual(seq.hypotheses_type_variables, {a})
+        self.assertEqual(RuleRefl(x).hypotheses_free_variables, set())
+        self.assertRaisesRegex(
+            RuleError, "'x : a' occurs free in hypothesis",
+            RuleAbs, x, seq)
+        self.assertTrue(RuleAbs(k, RuleRefl(k)).is_rule_abs())
+        # untouched hypotheses are shared
+        seq2 = RuleSubst({k: k}, seq)
+        self.assertIs(seq2.hypotheses, seq.hypotheses)
+        seq2 = RuleInstType({b: BoolType()}, seq)
+        self.assertIs(seq2.hypotheses, seq.hypotheses)
+        seq2 = RuleSubst({z: x}, seq)
+        self.assertEqual(seq2.hypotheses, {Equal(x, y), Equal(y, x)})
+        self.assertEqual(seq2.hypotheses_free_variables, {x, y})
+        seq2 = RuleInstType({a: b}, seq)
+        self.assertEqual(seq2.hypotheses_type_variables, {b})
+
+    def test_sequent_match(self):
+        with Theory():
+            x, y = Variables('x', 'y', bool)
+            a = TypeVariable('a')
+            z = Variable('z', a)
+            seq = new_axiom(Forall(z, Equal(z, z)))
+            self.assertIs(seq.matcher, seq.matcher)
+            self.assertRaises(TypeError, seq.match, 0)
+            self.assertEqual(
+                seq.match(Forall(x, Iff(x, x))), ({a: BoolType()}, {}))
+            self.assertIsNone(seq.match(Forall(x, Iff(x, Truth()))))
+            self.assertIsNone(seq.match(Exists(x, Iff(x, x))))
+
+            # hypotheses fix their variables
+            seq = RuleAssume(Or(x, y))
+            self.assertEqual(seq.match(Or(x, y)), ({}, {}))
+            self.assertIsNone(seq.match(Or(x, x)))
+
+            seq = RuleAxiom(Or(x, y))
+            self.assertEqual(seq.match(Or(Truth(), y)), ({}, {x: Truth()}))
+            self.assertIsNone(seq.match(And(x, y)))
+
+    def test_sequent_match_instantiate(self):
+        with Theory():
+            x, y = Variables('x', 'y', bool)
+            P = Variable('P', FunctionType(bool, bool))
+            Q = Variable('Q', FunctionType(bool, bool, bool))
+            seq = new_axiom(Forall(x, P(x)))
+            goal = Forall(x, Or(x, Not(x)))
+            self.assertEqual(
+                seq.match(goal), ({}, {P: Abstraction(x, Or(x, Not(x)))}))
+            self.assertEqual(seq.match_instantiate(goal).conclusion, goal)
+            self.assertIsNone(seq.match_instantiate(Exists(x, x)))
+            seq = new_axiom(Forall(x, Exists(y, Q(x, y))))
+            for goal in (
+                    Forall(x, Exists(y, And(y, x))),
+                    Forall(x, Exists(y, And(y, y))),
+                    Forall(x, Exists(y, Truth()))):
+                self.assertEqual(
+                    seq.match_instantiate(goal),
+                    RuleAxiom(goal))
+            # y is not in the scope of P
+            seq = new_axiom(Forall(x, Exists(y, P(x))))
+            self.assertIsNone(
+                seq.match_instantiate(Forall(x, Exists(y, And(y, x)))))
+
 
 if __name__ == '__main__':
     main()
@@ -1,7 +1,11 @@
 # Copyright (C) 2023 IBM Corp.
 # SPDX-License-Identifier: Apache-2.0
 
+import pathlib
+import tempfile
+
 from ulkb import *
+from ulkb import util
 from ulkb.converter import ConverterSettings
 from ulkb.parser import ParserSettings
 from ulkb.serializer import SerializerSettings
@@ -11,6 +15,51 @@ from .tests import ULKB_TestCase, main
 
 class TestTheory(ULKB_TestCase):
 
+    def test_stack(self):
+        import asyncio
+        import threading
+        top = Theory.top
+        with Theory() as th1:
+            self.assertIs(Theory.top, th1)
+            with Theory() as th2:
+                self.assertIs(Theory.top, th2)
+                self.assertIs(th1.top, th2)
+                self.assertIs(Theory().top, th2)
+            self.assertIs(Theory.top, th1)
+        self.assertIs(Theory.top, top)
+
+        # threads
+        barrier, tops = threading.Barrier(2), {}
+
+        def f(i):
+            with Theory() as thy:
+                barrier.wait()
+                tops[i] = (thy, Theory.top)
+                barrier.wait()
+        ts = [threading.Thread(target=f, args=(i,)) for i in range(2)]
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+        self.assertIsNot(tops[0][0], tops[1][0])
+        self.assertIs(tops[0][0], tops[0][1])
+        self.assertIs(tops[1][0], tops[1][1])
+        self.assertIs(Theory.top, top)
+
+        # asyncio tasks
+        async def g():
+            with Theory() as thy:
+                await asyncio.sleep(0)
+                return thy, Theory.top
+
+        async def h():
+            return await asyncio.gather(g(), g())
+        (th1, top1), (th2, top2) = asyncio.run(h())
+        self.assertIsNot(th1, th2)
+        self.assertIs(th1, top1)
+        self.assertIs(th2, top2)
+        self.assertIs(Theory.top, top)
+
     def test_prelude(self):
         with EmptyTheory() as thy:
             self.assertIsNone(thy.prelude)
@@ -31,6 +80,264 @@ class TestTheory(ULKB_TestCase):
             thy.new_axiom(Truth())
             self.assertTrue(bool(thy.args_no_prelude))
 
+    def test_load_cache(self):
+        import sys
+        with tempfile.TemporaryDirectory() as tmp:
+            src = pathlib.Path(tmp) / 'ulkb_test_load_cache.py'
+            src.write_text("""\
+from ulkb import *
+a = new_base_type('a')
+c = new_constant('c', a)
+new_axiom('ax', Equal(c, c))
+new_definition('d', Equal(c, c))
+""")
+            cache_dir = pathlib.Path(tmp) / 'cache'
+            sys.path.insert(0, tmp)
+            try:
+                with Theory() as thy:
+                    mod = thy.load('ulkb_test_load_cache', cache_dir)
+                    self.assertIsNotNone(mod)
+                    self.assertEqual(len(list(cache_dir.iterdir())), 1)
+                    exts = thy.args_no_prelude
+                del sys.modules['ulkb_test_load_cache']
+                with Theory() as thy:
+                    mod = thy.load('ulkb_test_load_cache', cache_dir)
+                    self.assertIsNone(mod)
+                    self.assertNotIn('ulkb_test_load_cache', sys.modules)
+                    self.assertEqual(thy.args_no_prelude, exts)
+                    self.assertEqual(thy.lookup_constant('c'), exts[1][0])
+                    self.assertEqual(thy.lookup_constant('d').id, 'd')
+                    self.assertEqual(
+                        thy.lookup_axiom('ax').conclusion, exts[2][1])
+                    thy.load('ulkb_test_load_cache', cache_dir)
+                    self.assertEqual(thy.args_no_prelude, exts)
+                # conflicting id
+                with Theory() as thy:
+                    thy.new_axiom('ax', Truth())
+                    self.assertRaisesRegex(
+                        ExtensionError, "extension 'ax' already exists",
+                        thy.load, 'ulkb_test_load_cache', cache_dir)
+            finally:
+                sys.path.remove(tmp)
+                sys.modules.pop('ulkb_test_load_cache', None)
+
+    def test_load_cache_reload(self):
+        import sys
+        with tempfile.TemporaryDirectory() as tmp:
+            src = pathlib.Path(tmp) / 'ulkb_test_load_cache_reload.py'
+            src.write_text("""\
+from ulkb import *
+a = new_base_type('a')
+new_constant('c', a)
+""")
+            cache_dir = pathlib.Path(tmp) / 'cache'
+            sys.path.insert(0, tmp)
+            try:
+                with Theory() as thy:
+                    thy.load('ulkb_test_load_cache_reload')
+                    exts = thy.args_no_prelude
+                    # extensions already present: still cached
+                    thy.load('ulkb_test_load_cache_reload', cache_dir)
+                    self.assertEqual(thy.args_no_prelude, exts)
+                with Theory() as thy:
+                    thy.load('ulkb_test_load_cache_reload', cache_dir)
+                    self.assertEqual(thy.args_no_prelude, exts)
+            finally:
+                sys.path.remove(tmp)
+                sys.modules.pop('ulkb_test_load_cache_reload', None)
+
+    def test_load_cache_theory(self):
+        import sys
+        with tempfile.TemporaryDirectory() as tmp:
+            src = pathlib.Path(tmp) / 'ulkb_test_load_cache_theory.py'
+            src.write_text("""\
+from ulkb import *
+c = new_constant('c', BaseType('a'))
+new_axiom('axb', Equal(c, c))
+""")
+            cache_dir = pathlib.Path(tmp) / 'cache'
+            sys.path.insert(0, tmp)
+            try:
+                with Theory() as thy:
+                    thy.new_base_type('a')
+                    thy.load('ulkb_test_load_cache_theory', cache_dir)
+                    self.assertEqual(len(list(cache_dir.iterdir())), 1)
+                # the entry is not replayed into a different theory
+                with Theory() as thy:
+                    self.assertRaisesRegex(
+                        ExtensionError, "undefined type constructor 'a'",
+                        thy.load, 'ulkb_test_load_cache_theory', cache_dir)
+                    self.assertIsNone(thy.lookup_axiom('axb', None))
+            finally:
+                sys.path.remove(tmp)
+                sys.modules.pop('ulkb_test_load_cache_theory', None)
+
+    def test_hexdigest(self):
+        thy1, thy2 = Theory(), Theory()
+        self.assertEqual(thy1.hexdigest, thy2.hexdigest)
+        self.assertNotEqual(
+            thy1.hexdigest, Theory(load_prelude=False).hexdigest)
+        d0 = thy1.hexdigest
+        a = thy1.new_base_type('a')
+        d1 = thy1.hexdigest
+        self.assertNotEqual(d0, d1)
+        c = thy1.new_constant('c', a)
+        d2 = thy1.hexdigest
+        self.assertEqual(d2, util.sha256(
+            (d1 + NewConstant(c).hexdigest).encode('utf-8')).hexdigest())
+        thy2.new_base_type('a')
+        self.assertEqual(thy2.hexdigest, d1)
+        thy2.new_constant('c', a)
+        self.assertEqual(thy2.hexdigest, d2)
+        thy1.reset(-1)
+        self.assertEqual(thy1.hexdigest, d1)
+        thy1.reset()
+        self.assertEqual(thy1.hexdigest, d0)
+        thy2.freeze()
+        self.assertEqual(thy2.hexdigest, d2)
+
+    def test_retract(self):
+        thy = Theory()
+        a = thy.new_base_type('a')
+        b = thy.new_base_type('b')
+        c = thy.new_constant('c', a)
+        d = thy.new_constant('d', b)
+        thy.new_axiom('ax1', Equal(c, c))
+        thy.new_axiom('ax2', Equal(d, d))
+        thy.new_definition('e', c)
+        f = thy.new_constant('f', a)
+        thy.new_axiom('ax3', Equal(thy.lookup_constant('e'), f))
+        n, digest = len(thy), thy.hexdigest
+        self.assertRaisesRegex(
+            TheoryError, "extension 'c' has dependents",
+            thy.retract, 'c', cascade=False)
+        self.assertEqual(len(thy), n)
+        removed = thy.retract(c)
+        self.assertEqual(
+            list(map(lambda x: x.id, removed)), ['c', 'ax1', 'e', 'ax3'])
+        self.assertEqual(len(thy), n - 4)
+        self.assertIsNone(thy.lookup_constant('c', None))
+        self.assertIsNone(thy.lookup_definition('e', None))
+        self.assertIsNone(thy.lookup_axiom('ax3', None))
+        self.assertEqual(thy.lookup_axiom('ax2').conclusion, Equal(d, d))
+        self.assertEqual(thy.lookup_constant('f'), f)
+        # digest matches the theory rebuilt from scratch
+        thy2 = Theory(*thy.args_no_prelude)
+        self.assertEqual(thy.hexdigest, thy2.hexdigest)
+        self.assertNotEqual(thy.hexdigest, digest)
+        for ext in removed:
+            thy.extend(ext)
+        self.assertEqual(len(thy), n)
+        self.assertEqual(thy.retract('ax2', cascade=False)[0].id, 'ax2')
+        self.assertEqual(
+            list(map(lambda x: x.id, thy.retract(-1))), ['ax3'])
+        self.assertRaises(LookupError, thy.retract, 'x')
+        # retract type constructor
+        self.assertEqual(
+            list(map(lambda x: x.id, thy.retract(a.head))),
+            ['a', 'f', 'c', 'ax1', 'e'])
+        self.assertEqual(
+            list(map(lambda x: x.id, thy.args_no_prelude)), ['b', 'd'])
+
+    def test_retract_theorems(self):
+        with Theory() as thy:
+            a = thy.new_base_type('a')
+            c = thy.new_constant('c', a)
+            thy.new_axiom('ax', Equal(c, c))
+            thy.new_definition('e', c)
+            thy.new_theorem('th1', thy.lookup_axiom('ax'))
+            thy.new_theorem('th2', RuleRefl(c))
+            thy.new_theorem('th3', RuleTrans(
+                thy.lookup_definition('e'), RuleRefl(c)))
+            thy.new_theorem('th4', RuleZ3(Equal(c, c)))
+            thy.settings.record_proofs = False
+            thy.new_theorem('th5', RuleRefl(c))
+            thy.settings.record_proofs = True
+            self.assertRaisesRegex(
+                TheoryError, "extension 'ax' has dependents",
+                thy.retract, 'ax', cascade=False)
+            self.assertEqual(
+                list(map(lambda x: x.id, thy.retract('ax'))),
+                ['ax', 'th1', 'th4', 'th5'])
+            self.assertIsNone(thy.lookup_theorem('th1', None))
+            self.assertEqual(thy.lookup_theorem('th2').conclusion, Equal(c, c))
+            self.assertEqual(
+                list(map(lambda x: x.id, thy.retract('e'))), ['e', 'th3'])
+            self.assertEqual(
+                list(map(lambda x: x.id, thy.args_no_prelude)),
+                ['a', 'c', 'th2'])
+
+    def test_diff_apply(self):
+        import json
+        thy1, thy2 = Theory(), Theory()
+        for thy in (thy1, thy2):
+            a = thy.new_base_type('a')
+            c = thy.new_constant('c', a)
+        thy1.new_constant('d', a)
+        thy1.new_axiom('ax1', Equal(c, c))
+        thy2.new_constant('e', a)
+        delta = thy1.diff(thy2)
+        self.assertEqual(delta['offset'], thy1.prelude_offset + 2)
+        self.assertEqual(len(delta['removed']), 2)
+        self.assertEqual(len(delta['added']), 1)
+        self.assertEqual(thy1.diff(thy1)['removed'], [])
+        self.assertEqual(thy1.diff(thy1)['added'], [])
+        delta = json.loads(json.dumps(delta))
+        self.assertIs(thy1.apply(delta), thy1)
+        self.assertEqual(thy1, thy2)
+        self.assertEqual(thy1.hexdigest, thy2.hexdigest)
+        self.assertEqual(thy1.lookup_constant('e'), Constant('e', a))
+        self.assertIsNone(thy1.lookup_constant('d', None))
+        self.assertIsNone(thy1.lookup_axiom('ax1', None))
+        self.assertRaisesRegex(
+            TheoryError, 'does not apply', thy1.apply, delta)
+        self.assertRaisesRegex(TheoryError, 'invalid delta', thy1.apply, {})
+        # failed delta leaves theory unchanged
+        thy3 = Theory()
+        thy3.new_base_type('a')
+        thy3.new_constant('c', a)
+        thy3.new_constant('d', a)
+        delta = thy3.diff(thy2)
+        delta['added'][0] = NewConstant(
+            Constant('k', BaseType('zz'))).to_ast()
+        digest = thy3.hexdigest
+        self.assertRaises(ExtensionError, thy3.apply, delta)
+        self.assertEqual(thy3.hexdigest, digest)
+        self.assertEqual(thy3.lookup_constant('d'), Constant('d', a))
+        delta['added'][0] = NewDefinition(
+            Equal(Variable('dd', a), Constant('zz', a))).to_ast()
+        self.assertRaises(ExtensionError, thy3.apply, delta)
+        self.assertEqual(thy3.hexdigest, digest)
+        self.assertIsNone(thy3.lookup_constant('dd', None))
+        thy3.new_constant('dd', a)
+
+    def test_freeze(self):
+        thy = Theory()
+        a = thy.new_base_type('a')
+        c = thy.new_constant('c', a)
+        thy.new_axiom('ax', Equal(c, c))
+        self.assertFalse(thy.frozen)
+        digest = thy.hexdigest
+        self.assertIs(thy.freeze(), thy)
+        self.assertTrue(thy.frozen)
+        self.assertIs(thy.freeze(), thy)
+        self.assertEqual(thy.hexdigest, digest)
+        self.assertIsNotNone(thy._hash)
+        self.assertIsInstance(thy.args, tuple)
+        self.assertIsInstance(thy.type_constructors, frozenset)
+        with self.assertRaises(TypeError):
+            thy.constants_dict['x'] = c
+        self.assertEqual(thy.lookup_constant('c'), c)
+        self.assertEqual(thy.lookup_axiom('ax').conclusion, Equal(c, c))
+        self.assertRaisesRegex(
+            TheoryError, 'theory is frozen', thy.new_constant, 'd', a)
+        self.assertRaisesRegex(
+            TheoryError, 'theory is frozen', thy.extend, NewConstant(c))
+        self.assertRaisesRegex(TheoryError, 'theory is frozen', thy.reset)
+        self.assertEqual(thy.lookup_constant('c'), c)
+        with thy:
+            self.assertEqual(Constant('c', a), c)
+
     def test_settings(self):
         self.assertEqual(settings.converter, ConverterSettings())
         self.assertEqual(settings.parser, ParserSettings())
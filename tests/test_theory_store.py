@@ -0,0 +1,154 @@
+# Copyright (C) 2023 IBM Corp.
+# SPDX-License-Identifier: Apache-2.0
+
+import pathlib
+import tempfile
+
+from ulkb import *
+
+from .tests import ULKB_TestCase, main
+
+
+class TestTheoryStore(ULKB_TestCase):
+
+    def mk_theory(self):
+        thy = Theory()
+        with thy:
+            a = new_base_type('a')
+            c = new_constant('c', a)
+            d = new_constant('d', a)
+            P = new_constant('P', FunctionType(a, bool))
+            new_axiom('ax1', P(c))
+            new_axiom('ax2', P(d))
+            new_definition('e', c)
+            new_theorem('th', RuleAssume(P(c)))
+        return thy
+
+    def test_from_theory(self):
+        thy = self.mk_theory()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / 'thy.db'
+            with TheoryStore.from_theory(thy, path) as store:
+                self.assertEqual(len(store), len(thy.args_no_prelude))
+            with TheoryStore(path) as store:
+                self.assertEqual(len(store), len(thy.args_no_prelude))
+                self.assertEqual(list(store), thy.args_no_prelude)
+                self.assertEqual(store.to_theory(), thy)
+
+    def test_materialize(self):
+        thy = self.mk_theory()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / 'thy.db'
+            TheoryStore.from_theory(thy, path).close()
+            with TheoryStore(path, cache_size=2) as store:
+                self.assertEqual(len(store._cache), 0)
+                self.assertEqual(store[-1], thy.args_no_prelude[-1])
+                self.assertEqual(len(store._cache), 1)
+                self.assertEqual(store[1:3], thy.args_no_prelude[1:3])
+                self.assertEqual(len(store._cache), 2)
+                self.assertRaises(IndexError, store.__getitem__, 100)
+
+    def test_add(self):
+        thy = self.mk_theory()
+        with TheoryStore.from_theory(thy) as store:
+            self.assertRaisesRegex(
+                ExtensionError, "'c' already exists",
+                store.add, thy.lookup_extension('c'))
+            n = len(store)
+            b = BaseType('b')
+            store.extend([
+                NewTypeConstructor(b.head),
+                NewConstant(Constant('k', b))])
+            self.assertEqual(len(store), n + 2)
+            self.assertEqual(store.lookup_constant('k'), Constant('k', b))
+            self.assertEqual(store.to_theory().args_no_prelude, list(store))
+
+    def test_add_ill_formed(self):
+        with TheoryStore() as store:
+            zz = BaseType('zz')
+            k = Constant('k', zz)
+            self.assertRaisesRegex(
+                ExtensionError, "undefined type constructor 'zz'",
+                store.add, NewAxiom(Constant('ax', bool), Equal(k, k)))
+            self.assertRaisesRegex(
+                ExtensionError, "undefined type constructor 'zz'",
+                store.add, NewConstant(k))
+            self.assertRaisesRegex(
+                ExtensionError, "undefined constant",
+                store.add, NewDefinition(Equal(
+                    Variable('d', IntType()), Constant('x', IntType()))))
+            self.assertRaisesRegex(
+                ExtensionError, "undefined type spec",
+                store.add, NewTypeSpec('x'))
+            # nothing is stored by a failed transaction
+            self.assertRaises(
+                ExtensionError, store.extend, [
+                    NewTypeConstructor(zz.head),
+                    NewConstant(Constant('x', BaseType('yy')))])
+            self.assertEqual(len(store), 0)
+            # prelude symbols are known
+            store.add(NewAxiom(Constant('ax', bool), Equal(
+                Constant('x', IntType()), Constant('x', IntType()))))
+            store.add(NewDefinition(Equal(
+                Variable('d', FunctionType(IntType(), bool)),
+                Abstraction(Variable('y', IntType()), Truth()))))
+            self.assertEqual(len(store), 2)
+
+    def test_lookup(self):
+        thy = self.mk_theory()
+        with TheoryStore.from_theory(thy) as store:
+            for f in ['extension', 'type_constructor', 'constant',
+                      'axiom', 'definition', 'theorem']:
+                for id in ['a', 'c', 'ax1', 'e', 'th', 'x']:
+                    self.assertEqual(
+                        getattr(store, 'lookup_' + f)(id, None),
+                        getattr(thy, 'lookup_' + f)(id, None))
+            self.assertEqual(
+                store.lookup_constant(thy.lookup_constant('c')),
+                thy.lookup_constant('c'))
+            self.assertRaisesRegex(
+                LookupError, "no such constant 'x'",
+                store.lookup_constant, 'x')
+            self.assertRaises(
+                LookupError, store.lookup_constant,
+                Constant('c', BaseType('b')))
+
+    def test_enumerate_extensions(self):
+        thy = self.mk_theory()
+        with TheoryStore.from_theory(thy) as store:
+            c, d = thy.lookup_constant('c'), thy.lookup_constant('d')
+            k = thy.prelude_offset
+            for kwargs in [
+                    dict(), dict(limit=2), dict(offset=3),
+                    dict(id='ax'), dict(class_=NewAxiom),
+                    dict(class_=Assumption, limit=3)]:
+                for args in [(), (c,), (d,), (c, d), (BaseType('a'),)]:
+                    self.assertEqual(
+                        list(store.enumerate_extensions(*args, **kwargs)),
+                        [(i - k, x) for i, x in thy.enumerate_extensions(
+                            *args, **{**kwargs, 'offset': k + kwargs.get(
+                                'offset', 0)})])
+
+    def test_concurrent_writers(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / 'thy.db'
+            with TheoryStore(path) as s1, TheoryStore(path) as s2:
+                s1.add(NewTypeConstructor(TypeConstructor('a', 0)))
+                s2.add(NewTypeConstructor(TypeConstructor('b', 0)))
+                s1.add(NewConstant(Constant('k', BaseType('b'))))
+                self.assertEqual(len(s1), 3)
+                self.assertEqual(len(s2), 3)
+                self.assertEqual(list(s1), list(s2))
+                # rolled-back additions are not cached
+                t = BaseType('a')
+                self.assertRaises(ExtensionError, s1.extend, [
+                    NewConstant(Constant('c1', t)),
+                    NewConstant(Constant('c2', BaseType('zzz')))])
+                zzz = NewTypeConstructor(TypeConstructor('zzz', 0))
+                s2.add(zzz)
+                self.assertEqual(s1[3], zzz)
+                self.assertEqual(list(s1), list(s2))
+
+
+if __name__ == '__main__':
+    main()
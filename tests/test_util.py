@@ -0,0 +1,40 @@
+# Copyright (C) 2023 IBM Corp.
+# SPDX-License-Identifier: Apache-2.0
+
+from ulkb import util
+
+from .tests import ULKB_TestCase, main
+
+
+class TestUtil(ULKB_TestCase):
+
+    def test_lru_cache(self):
+        cache = util.LRUCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        self.assertEqual(cache['a'], 1)  # 'a' is now the most recent
+        cache['c'] = 3
+        self.assertNotIn('b', cache)
+        self.assertIn('a', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.get('a'), 1)
+        cache['d'] = 4
+        self.assertNotIn('c', cache)
+        self.assertEqual(len(cache), 2)
+        cache['a'] = 5                   # update refreshes recency
+        cache['e'] = 6
+        self.assertNotIn('d', cache)
+        self.assertEqual(cache.get('a'), 5)
+        self.assertIsNone(cache.get('x'))
+        self.assertEqual(cache.pop('a'), 5)
+        self.assertEqual(len(cache), 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        unbounded = util.LRUCache(None)
+        for i in range(1000):
+            unbounded[i] = i
+        self.assertEqual(len(unbounded), 1000)
+
+
+if __name__ == '__main__':
+    main()
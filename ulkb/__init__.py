@@ -11,11 +11,13 @@ from .extension import *
 from .object import *
 from .parser import ParserError
 from .prelude import *
+from .proof import *
 from .rule import *
 from .sequent import *
 from .serializer import SerializerError
 from .theory import *
 from .theory_settings import *
+from .theory_store import *
 
 Theory._prelude_prefix = __name__
 Theory.top._prelude = sys.modules[__name__ + '.prelude']
@@ -33,8 +35,10 @@ __all__ = [
     *extension.__all__,
     *object.__all__,
     *prelude.__all__,
+    *proof.__all__,
     *rule.__all__,
     *sequent.__all__,
     *theory.__all__,
     *theory_settings.__all__,
+    *theory_store.__all__,
 ]
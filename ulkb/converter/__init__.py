@@ -4,4 +4,4 @@
 from .ast import ConverterAST
 from .converter import *
 from .sparql import ConverterSPARQL
-from .z3 import ConverterZ3
+from .z3 import ConverterZ3, ConverterZ3_Cache
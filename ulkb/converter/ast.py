@@ -28,7 +28,9 @@ class ConverterAST(
         return self._do_convert_from(self.arg)
 
     def _do_convert_from(self, ast):
-        if not isinstance(ast, dict):
+        if isinstance(ast, list):
+            return list(map(self._do_convert_from, ast))
+        elif not isinstance(ast, dict):
             return ast
         if self.class_tag not in ast:
             raise self.error(f"missing required field '{self.class_tag}'")
@@ -65,7 +67,7 @@ class ConverterAST(
     def _do_convert_to(self, obj):
         if not self.cls.Object.test(obj):  # ensure JSON-compatibility
             if isinstance(obj, (set, frozenset)):
-                return list(obj)
+                return list(map(self._do_convert_to, obj))
             elif isinstance(obj, type):
                 return str(obj.__name__)
             else:
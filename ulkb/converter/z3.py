@@ -1,13 +1,60 @@
 # Copyright (C) 2023 IBM Corp.
 # SPDX-License-Identifier: Apache-2.0
 
-from .. import util
+import threading
+import time
+
+from .. import error, util
 from ..settings import Settings
 from .converter import Converter
 
 
 class ConverterZ3_Settings(Settings):
-    pass
+    """ConverterZ3 settings."""
+
+    #: Whether to use the conversion tables of the top theory (if no
+    #: `cache` is given to the converter).
+    theory_cache = False
+
+    #: Maximum number of simplification results kept by theory (``None``
+    #: means unbounded).
+    simplify_cache_size = 1024
+
+
+#: Recursive functions defined for abstractions, by name.
+_rec_functions = dict()
+
+
+class ConverterZ3_Cache:
+    """Conversion tables of :class:`ConverterZ3`.
+
+    Maps sorts, function symbols and terms to their Z3 counterparts.  A
+    cache can be shared by many conversions (argument `cache` of
+    :meth:`Object.to_z3`); each shared type, symbol, term, or abstraction
+    is then converted (and, for abstractions, defined) only once.  The
+    symbols are also mapped back, so that :meth:`Object.from_z3` with the
+    same cache recovers the original constants, variables and
+    abstractions.
+    """
+
+    __slots__ = (
+        'asts',
+        'atoms',
+        'decls',
+        'sorts',
+    )
+
+    def __init__(self):
+        self.sorts = dict()     # Type -> z3 sort (or tuple of sorts)
+        self.decls = dict()     # Constant or Variable -> z3 decl or const
+        self.asts = dict()      # Term -> z3 ast
+        self.atoms = dict()     # z3 decl id -> Constant, Variable or λ
+
+    def clear(self):
+        self.atoms.clear()
+        self.sorts.clear()
+        self.decls.clear()
+        self.asts.clear()
 
 
 class ConverterZ3(
@@ -15,13 +62,19 @@ class ConverterZ3(
         settings=ConverterZ3_Settings):
 
     def __init__(self, cls, arg, prove=None, simplify=None, solve=None,
-                 **kwargs):
+                 cache=None, **kwargs):
         import z3
         super().__init__(cls, arg, **kwargs)
         # settings
         self.settings = cls._thy().settings.converter.z3(**kwargs)
         # internal attributes
         self.z3 = z3
+        if cache is None:
+            if self.settings.theory_cache:
+                cache = cls._thy()._get_z3().cache
+            else:
+                cache = ConverterZ3_Cache()
+        self.cache = cache
         self.prove = prove
         self.simplify = simplify
         self.solver = solve
@@ -32,38 +85,103 @@ class ConverterZ3(
     def _do_convert_type_from(self, z3obj):
         if z3obj == self.z3.BoolSort():
             return self.cls.BoolType()
+        elif z3obj == self.z3.IntSort():
+            return self.cls.IntType()
+        elif z3obj == self.z3.RealSort():
+            return self.cls.RealType()
         else:
             return self.cls.BaseType(z3obj.name())
 
     def _do_convert_from(self, z3obj):
         if self.z3.is_sort(z3obj):
             return self._do_convert_type_from(z3obj)
+        # Iterative post-order traversal.  Results are memoized by AST id
+        # and by the variables bound in context (de Bruijn Var's are
+        # converted to the context variables they refer to).
+        memo = dict()
+        stack = [(z3obj, (), False)]
+        while stack:
+            e, ctx, ready = stack.pop()
+            key = (e.get_id(), ctx)
+            if key in memo:
+                continue
+            children, cctx = self._get_children_from(e, ctx)
+            if ready:
+                args = [memo[(c.get_id(), cctx)] for c in children]
+                memo[key] = self._do_convert_node_from(e, ctx, cctx, args)
+            else:
+                stack.append((e, ctx, True))
+                for c in reversed(children):
+                    if (c.get_id(), cctx) not in memo:
+                        stack.append((c, cctx, False))
+        return memo[(z3obj.get_id(), ())]
+
+    def _get_children_from(self, z3obj, ctx):
+        if self.z3.is_quantifier(z3obj):
+            xs = []
+            for i in range(z3obj.num_vars()):
+                x = self.cls.Variable(
+                    z3obj.var_name(i),
+                    self._do_convert_type_from(z3obj.var_sort(i)))
+                xs.append(x.get_variant(lambda y: y in ctx or y in xs))
+            return [z3obj.body()], ctx + tuple(xs)
+        elif self.z3.is_app(z3obj):
+            return z3obj.children(), ctx
+        else:
+            return [], ctx
+
+    def _do_convert_node_from(self, z3obj, ctx, cctx, args):
         if self.z3.is_true(z3obj):
             return self.cls.Truth()
         elif self.z3.is_false(z3obj):
             return self.cls.Falsity()
         elif self.z3.is_eq(z3obj):
-            args = z3obj.children()
-            return self.cls.Equal(*map(self._do_convert_from, args))
+            return self.cls.Equal(*args)
+        elif self.z3.is_distinct(z3obj):
+            return self._mk_and_from([
+                self.cls.Not(self.cls.Equal(args[i], args[j]))
+                for i in range(len(args)) for j in range(i + 1, len(args))])
         elif self.z3.is_not(z3obj):
-            (t,) = z3obj.children()
-            return self.cls.Not(self._do_convert_from(t))
+            return self.cls.Not(*args)
         elif self.z3.is_and(z3obj):
-            args = z3obj.children()
-            return self.cls.And(*map(self._do_convert_from, args))
+            return self._mk_and_from(args)
         elif self.z3.is_or(z3obj):
-            args = z3obj.children()
-            return self.cls.Or(*map(self._do_convert_from, args))
+            if not args:
+                return self.cls.Falsity()
+            return args[0] if len(args) == 1 else self.cls.Or(*args)
         elif self.z3.is_implies(z3obj):
-            args = z3obj.children()
-            return self.cls.Implies(*map(self._do_convert_from, args))
+            return self.cls.Implies(*args)
         elif self.z3.is_quantifier(z3obj):
+            xs = cctx[len(ctx):]
             if z3obj.is_forall():
-                pass
+                return self.cls.Forall(*xs, *args)
             elif z3obj.is_exists():
-                pass
+                return self.cls.Exists(*xs, *args)
             else:
-                raise self.error(f"cannot convert '{z3obj}'")
+                return self.cls.Abstraction(*xs, *args)
+        elif self.z3.is_var(z3obj):
+            return ctx[-1 - self.z3.get_var_index(z3obj)]
+        elif self.z3.is_int_value(z3obj):
+            return self.cls.IntType.cast(z3obj.as_long())
+        elif self.z3.is_rational_value(z3obj):
+            return self.cls.RealType.cast(z3obj.as_fraction())
+        elif (self.z3.is_le(z3obj) or self.z3.is_lt(z3obj)
+              or self.z3.is_ge(z3obj) or self.z3.is_gt(z3obj)):
+            if self.z3.is_int(z3obj.arg(0)):
+                type = self.cls.IntType
+            else:
+                type = self.cls.RealType
+            if self.z3.is_le(z3obj):
+                return type.le(*args)
+            elif self.z3.is_lt(z3obj):
+                return type.lt(*args)
+            elif self.z3.is_ge(z3obj):
+                return type.ge(*args)
+            else:
+                return type.gt(*args)
+        elif z3obj.decl().get_id() in self.cache.atoms:
+            atom = self.cache.atoms[z3obj.decl().get_id()]
+            return atom(*args) if args else atom
         elif self.z3.is_const(z3obj):
             name = str(z3obj)
             type = self._do_convert_type_from(z3obj.sort())
@@ -71,10 +189,24 @@ class ConverterZ3(
                 return self.cls.Variable(name[1:], type)
             else:
                 return self.cls.Constant(name, type)
+        elif (self.z3.is_app(z3obj) and z3obj.decl().kind()
+              == self.z3.Z3_OP_UNINTERPRETED):
+            decl = z3obj.decl()
+            type = self.cls.FunctionType(*map(
+                self._do_convert_type_from,
+                [*map(decl.domain, range(decl.arity())), decl.range()]))
+            return self.cls.Constant(decl.name(), type)(*args)
         else:
             raise self.error(f"cannot convert '{z3obj}'")
 
+    def _mk_and_from(self, args):
+        if not args:
+            return self.cls.Truth()
+        return args[0] if len(args) == 1 else self.cls.And(*args)
+
     def do_convert_to(self):
+        if self.simplify:
+            return self._do_simplify(self.arg, self.simplify)
         z3obj = self._do_convert_to(self.arg)
         if self.prove:
             solver = self.z3.Solver()
@@ -86,8 +218,6 @@ class ConverterZ3(
                 return None
             else:
                 return False
-        elif self.simplify:
-            raise NotImplementedError
         elif self.solver is True:
             solver = self.z3.Solver()
             solver.add(z3obj)
@@ -98,10 +228,52 @@ class ConverterZ3(
         else:
             return z3obj
 
+    def _do_simplify(self, obj, tactic):
+        # `tactic` is True (z3.simplify), a tactic name, or a sequence of
+        # tactic names (applied in order).  Tactics only preserve
+        # satisfiability; the result is equivalent to `obj` only if they
+        # are equivalence-preserving (e.g., ctx-simplify,
+        # ctx-solver-simplify).
+        if tactic is True:
+            key = 'simplify'
+        elif isinstance(tactic, str):
+            key = tactic
+        else:
+            key = tuple(tactic)
+        simplified = self.cls._thy()._get_z3().simplified
+        res = simplified.get((obj.hexdigest, key))
+        if res is None:
+            z3obj = self._do_convert_to(obj)
+            if tactic is True:
+                z3res = self.z3.simplify(z3obj)
+            elif not self.z3.is_bool(z3obj):
+                raise self.error(f"cannot apply tactic to '{obj}'")
+            else:
+                names = (key,) if isinstance(key, str) else key
+                if len(names) == 1:
+                    t = self.z3.Tactic(names[0])
+                else:
+                    t = self.z3.Then(*names)
+                goal = self.z3.Goal()
+                goal.add(z3obj)
+                z3res = t(goal).as_expr()
+            res = self._do_convert_from(z3res)
+            simplified[(obj.hexdigest, key)] = res
+        return res
+
     def _do_convert_to(self, obj):
         if obj.is_type():
             return self._do_convert_type_to(obj)
-        elif obj.is_truth():
+        elif obj.is_term():
+            z3obj = self.cache.asts.get(obj)
+            if z3obj is None:
+                z3obj = self.cache.asts[obj] = self._do_convert_term_to(obj)
+            return z3obj
+        else:
+            return self._do_convert_term_to(obj)
+
+    def _do_convert_term_to(self, obj):
+        if obj.is_truth():
             return self.z3.BoolVal(True)
         elif obj.is_falsity():
             return self.z3.BoolVal(False)
@@ -150,32 +322,28 @@ class ConverterZ3(
             op, *args = obj._unfold_application()
             return self._do_convert_to(op)(*map(self._do_convert_to, args))
         elif obj.is_abstraction():
-            args = list(map(self._do_convert_to, obj._unfold_abstraction()))
-            f = self.z3.RecFunction(
-                f'({obj})', *map(lambda x: x.sort(), args))
-            self.z3.RecAddDefinition(f, args[:-1], args[-1])
+            # Z3 does not allow a recursive function to be defined twice,
+            # so definitions are shared by all converters.
+            name = f'(λ{obj.hexdigest})'
+            f = _rec_functions.get(name)
+            if f is None:
+                args = list(map(
+                    self._do_convert_to, obj._unfold_abstraction()))
+                f = self.z3.RecFunction(
+                    name, *map(lambda x: x.sort(), args))
+                self.z3.RecAddDefinition(f, args[:-1], args[-1])
+                _rec_functions[name] = f
+            self.cache.atoms[f.get_id()] = obj
             return f
         elif obj.is_constant() or obj.is_variable():
-            type = self._do_convert_type_to(obj.type)
-            if not obj.is_variable():
-                if isinstance(type, tuple):
-                    if (obj == self.cls.RealType.ge
-                            or obj == self.cls.IntType.ge):
-                        return self.z3.ArithRef.__ge__
-                    elif (obj == self.cls.RealType.gt
-                          or obj == self.cls.IntType.gt):
-                        return self.z3.ArithRef.__gt__
-                    elif (obj == self.cls.RealType.le
-                          or obj == self.cls.IntType.le):
-                        return self.z3.ArithRef.__le__
-                    elif (obj == self.cls.RealType.lt
-                          or obj == self.cls.IntType.lt):
-                        return self.z3.ArithRef.__lt__
-                    else:
-                        return self.z3.Function(obj.id, *type)
-                elif isinstance(type, self.z3.ArithSortRef):
-                    return type.cast(obj.id)
-            return self.z3.Const(obj.id, type)
+            z3obj = self.cache.decls.get(obj)
+            if z3obj is None:
+                z3obj = self.cache.decls[obj] = self._do_convert_atom_to(obj)
+                if isinstance(z3obj, self.z3.FuncDeclRef):
+                    self.cache.atoms[z3obj.get_id()] = obj
+                elif self.z3.is_const(z3obj):
+                    self.cache.atoms[z3obj.decl().get_id()] = obj
+            return z3obj
         elif obj.is_theory():
             solver = self.z3.Solver()
             it = filter(lambda x: x.is_new_axiom(), obj.args_no_prelude)
@@ -185,7 +353,35 @@ class ConverterZ3(
         else:
             raise self.error(f"cannot convert '{obj}'")
 
+    def _do_convert_atom_to(self, obj):
+        type = self._do_convert_type_to(obj.type)
+        if not obj.is_variable():
+            if isinstance(type, tuple):
+                if (obj == self.cls.RealType.ge
+                        or obj == self.cls.IntType.ge):
+                    return self.z3.ArithRef.__ge__
+                elif (obj == self.cls.RealType.gt
+                      or obj == self.cls.IntType.gt):
+                    return self.z3.ArithRef.__gt__
+                elif (obj == self.cls.RealType.le
+                      or obj == self.cls.IntType.le):
+                    return self.z3.ArithRef.__le__
+                elif (obj == self.cls.RealType.lt
+                      or obj == self.cls.IntType.lt):
+                    return self.z3.ArithRef.__lt__
+                else:
+                    return self.z3.Function(obj.id, *type)
+            elif isinstance(type, self.z3.ArithSortRef):
+                return type.cast(obj.id)
+        return self.z3.Const(obj.id, type)
+
     def _do_convert_type_to(self, obj):
+        sort = self.cache.sorts.get(obj)
+        if sort is None:
+            sort = self.cache.sorts[obj] = self._do_convert_sort_to(obj)
+        return sort
+
+    def _do_convert_sort_to(self, obj):
         if obj.is_type_variable():
             return self.z3.DeclareSort(obj.id)
         elif obj.is_bool_type():
@@ -201,7 +397,141 @@ class ConverterZ3(
             args = obj._unfold_function_type()
             if any(map(lambda x: isinstance(x, tuple), args)):
                 raise ValueError(
-                    f"unsupported function type '{z3obj}'")
+                    f"unsupported function type '{obj}'")
             return tuple(map(self._do_convert_type_to, args))
         else:
             raise self.error(f"cannot convert '{obj}'")
+
+
+class _TheoryZ3:
+    """Z3 state of a theory: conversion tables, incremental solver,
+    simplification results and unsat cores.
+
+    Each scope of the solver asserts the axioms of a range of theory
+    extensions and is tagged with the offset and digest of theory at the
+    end of the range.  A scope is valid as long as theory still has the
+    same digest at that offset.  Axioms are asserted with tracking
+    literals, so that the unsat core of a check tells which axioms were
+    used.
+
+    The solver is shared by the threads using theory, so it must only be
+    used while holding :attr:`_TheoryZ3.lock`.
+    """
+
+    __slots__ = (
+        '_solver',
+        'cache',
+        'cores',
+        'last_core',
+        'lock',
+        'scopes',
+        'simplified',
+        'tracked',
+    )
+
+    def __init__(self, simplify_cache_size=None):
+        self._solver = None
+        self.lock = threading.RLock()
+        self.cache = ConverterZ3_Cache()
+        self.cores = None       # (goal digest, theory digest) -> axioms
+        self.last_core = None
+        self.scopes = []        # (end offset, end digest, literal ids)
+        self.simplified = util.LRUCache(simplify_cache_size)
+        self.tracked = dict()   # literal id -> axiom
+
+    def sync(self, thy):
+        import z3
+        if self._solver is None:
+            self._solver = z3.Solver()
+        n = len(thy.args)
+        while self.scopes:
+            end, digest, ids = self.scopes[-1]
+            if end <= n and thy._get_hexdigest_at(end) == digest:
+                break
+            if ids:
+                self._solver.pop()
+                for id in ids:
+                    del self.tracked[id]
+            self.scopes.pop()
+        start = self.scopes[-1][0] if self.scopes else thy.prelude_offset
+        if start < n:
+            axioms = [
+                ext[1] for ext in thy.args[start:] if ext.is_new_axiom()]
+            ids = []
+            if axioms:
+                self._solver.push()
+                for form in axioms:
+                    lit = z3.FreshBool('ax')
+                    self._solver.assert_and_track(
+                        form.to_z3(cache=self.cache), lit)
+                    self.tracked[lit.get_id()] = form
+                    ids.append(lit.get_id())
+            self.scopes.append((n, thy.hexdigest, ids))
+        return self._solver
+
+    def get_core(self):
+        # The axioms in the unsat core of the last check (in theory order).
+        return _get_core(self._solver, self.tracked)
+
+    def check_core(self, core, form, timeout):
+        # Checks whether `form` follows from the axioms `core`, using a
+        # solver of its own, and returns the axioms used (or None).
+        # Axioms not (or no longer) in the theory solver are not trusted.
+        import z3
+        if not set(core) <= set(self.tracked.values()):
+            return None
+        solver, tracked = z3.Solver(), dict()
+        solver.set('timeout', timeout)
+        for axiom in core:
+            lit = z3.FreshBool('ax')
+            solver.assert_and_track(axiom.to_z3(cache=self.cache), lit)
+            tracked[lit.get_id()] = axiom
+        solver.add(z3.Not(form.to_z3(cache=self.cache)))
+        if solver.check() != z3.unsat:
+            return None
+        return _get_core(solver, tracked)
+
+    def entails(self, thy, forms, timeout):
+        # Each goal and its negation are guarded by fresh literals and
+        # checked under them as assumptions, so all goals share one
+        # solver scope (and the lemmas learned in it).
+        import z3
+        with self.lock:
+            solver = self.sync(thy)
+            solver.set('timeout', timeout)
+            results = []
+            solver.push()
+            try:
+                for form in forms:
+                    form_z3 = form.to_z3(cache=self.cache)
+                    pos, neg = z3.FreshBool(), z3.FreshBool()
+                    solver.add(z3.Implies(pos, z3.Not(form_z3)))
+                    solver.add(z3.Implies(neg, form_z3))
+                    start = time.perf_counter()
+                    if solver.check(pos) == z3.unsat:
+                        res = True
+                    elif solver.check(neg) == z3.unsat:
+                        res = False
+                    else:
+                        res = None
+                    results.append((res, time.perf_counter() - start))
+            finally:
+                solver.pop()
+            return results
+
+
+def _get_core(solver, tracked):
+    ids = set(map(lambda x: x.get_id(), solver.unsat_core()))
+    return tuple(axiom for id, axiom in tracked.items() if id in ids)
+
+
+def _init_entails_worker(theory_ast):
+    from ..object import Object
+    Object.Theory.push(Object.Theory.from_ast(theory_ast))
+
+
+def _entails_worker(forms_ast, timeout):
+    from ..object import Object
+    thy = Object._thy()
+    return thy._get_z3().entails(
+        thy, list(map(Object.from_ast, forms_ast)), timeout)
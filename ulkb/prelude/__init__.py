@@ -7,9 +7,12 @@
 from .bootstrap import *
 from .formula import *
 from .order import *
+from .premise_selection import *
+from .rule_cc import *
 from .rule_derived import *
 from .rule_e import *
 from .rule_primitive import *
+from .rule_rewrite import *
 from .rule_z3 import *
 from .settings import *
 from .type_int import *
@@ -20,9 +23,12 @@ __all__ = [
     *bootstrap.__all__,
     *formula.__all__,
     *order.__all__,
+    *premise_selection.__all__,
+    *rule_cc.__all__,
     *rule_derived.__all__,
     *rule_e.__all__,
     *rule_primitive.__all__,
+    *rule_rewrite.__all__,
     *rule_z3.__all__,
     *type_int.__all__,
     *type_real.__all__,
@@ -0,0 +1,201 @@
+# Copyright (C) 2023 IBM Corp.
+# SPDX-License-Identifier: Apache-2.0
+
+from ..commands import _thy
+from .formula import *
+
+__all__ = [
+    'SInE',
+]
+
+
+class SInE:
+    r"""SInE premise selection.
+
+    Selects the axioms of theory relevant to a conjecture using the
+    trigger relation of SInE.  Let :math:`occ(s)` be the number of axioms
+    in which symbol :math:`s` occurs.  An axiom :math:`A` is triggered by
+    a symbol :math:`s` of :math:`A` if :math:`occ(s) ≤ t \cdot \min_{s' ∈
+    A} occ(s')`, where :math:`t ≥ 1` is the tolerance; that is, if
+    :math:`s` is among the least general symbols of :math:`A`.  Starting
+    from the symbols of the conjecture, the axioms triggered by the
+    selected symbols are selected, and their symbols are selected in turn,
+    for at most `depth` steps.  Symbols are the ids of the constants
+    occurring in axioms; the constants of the prelude (such as equality
+    and the logical connectives) are not symbols.
+
+    The symbol-occurrence index is kept across calls.  It is extended as
+    axioms are added to theory and rebuilt if extensions are removed.
+
+    The rules taking a premise selector (setting ``premise_selection`` of
+    :class:`RuleE` and :class:`RuleZ3`) try the problems restricted to the
+    selections returned by :meth:`SInE.widen` in order, and then the full
+    problem.
+
+    Parameters:
+       depth: Maximum number of selection steps (``None`` means
+          unbounded).
+       tolerance: Tolerance (at least 1).
+       schedule: Iterable of pairs ``(depth, tolerance)`` tried by
+          :meth:`SInE.widen` after `depth` and `tolerance` (default:
+          double `depth` and multiply `tolerance` by 1.5, then unbounded
+          depth and twice `tolerance`).
+
+    Returns:
+       A new :class:`SInE`.
+
+    .. code-block:: python
+       :caption: Example:
+
+       sine = SInE(depth=1)
+       print(sine.select(P(c)))
+       # [axiom ax1 (...), ...]
+
+       RuleZ3(P(c), premise_selection=sine)
+
+    See also:
+       K. Hoder and A. Voronkov, "Sine Qua Non for large theory
+       reasoning", CADE-23, 2011.
+    """
+
+    __slots__ = (
+        '_index',
+        'depth',
+        'schedule',
+        'tolerance',
+    )
+
+    def __init__(self, depth=None, tolerance=1.0, schedule=None):
+        if tolerance < 1:
+            raise ValueError(f'bad tolerance: {tolerance}')
+        self.depth = depth
+        self.tolerance = tolerance
+        if schedule is None:
+            schedule = (
+                (None if depth is None else 2 * depth, 1.5 * tolerance),
+                (None, 2 * tolerance))
+        self.schedule = tuple(schedule)
+        self._index = _SInEIndex()
+
+    def select(self, conj, depth=None, tolerance=None, theory=None):
+        """Selects the axioms relevant to `conj`.
+
+        Parameters:
+           conj: :class:`Formula`.
+           depth: Maximum number of selection steps (default:
+              :attr:`SInE.depth`).
+           tolerance: Tolerance (default: :attr:`SInE.tolerance`).
+           theory: :class:`Theory`.
+
+        Returns:
+           The list of selected :class:`NewAxiom`'s (in theory order).
+
+        Raises:
+           TypeError: `conj` is not a formula.
+        """
+        conj = Formula.check(conj, 'select', 'conj', 1)
+        if depth is None:
+            depth = self.depth
+        if tolerance is None:
+            tolerance = self.tolerance
+        index = self._index.sync(_thy(theory))
+        return list(map(
+            index.axioms.__getitem__,
+            sorted(index.select(conj, depth, tolerance))))
+
+    def widen(self, conj, theory=None):
+        """Iterates over increasingly larger selections for `conj`.
+
+        Yields the selections of :meth:`SInE.select` for `depth` and
+        `tolerance`, and then for each pair in :attr:`SInE.schedule`,
+        skipping selections already yielded and those containing all
+        axioms of theory.
+
+        Parameters:
+           conj: :class:`Formula`.
+           theory: :class:`Theory`.
+
+        Returns:
+           An iterator of lists of :class:`NewAxiom`'s.
+
+        Raises:
+           TypeError: `conj` is not a formula.
+        """
+        conj = Formula.check(conj, 'widen', 'conj', 1)
+        thy, seen = _thy(theory), set()
+        for depth, tolerance in ((self.depth, self.tolerance),
+                                 *self.schedule):
+            index = self._index.sync(thy)
+            sel = frozenset(index.select(conj, depth, tolerance))
+            if sel in seen or len(sel) == len(index.axioms):
+                continue
+            seen.add(sel)
+            yield list(map(index.axioms.__getitem__, sorted(sel)))
+
+
+class _SInEIndex:
+    """Symbol-occurrence index of the axioms of a theory.
+
+    Like the Z3 solver of theory, the index covers theory up to a given
+    offset and is valid as long as theory has the same digest at that
+    offset.
+    """
+
+    __slots__ = (
+        'axioms',
+        'digest',
+        'end',
+        'occ',
+        'prelude',
+        'symbols',
+        'uses',
+    )
+
+    def __init__(self):
+        self.end = None
+
+    def sync(self, thy):
+        n = len(thy.args)
+        if (self.end is None or self.end > n
+                or thy._get_hexdigest_at(self.end) != self.digest):
+            self.axioms = []    # NewAxiom's
+            self.symbols = []   # axiom index -> symbols
+            self.occ = dict()   # symbol -> number of axioms
+            self.uses = dict()  # symbol -> axiom indices
+            self.prelude = frozenset(map(
+                lambda x: x.id, filter(
+                    lambda x: x.is_new_constant() or x.is_new_definition(),
+                    thy.args[:thy.prelude_offset])))
+            self.end = thy.prelude_offset
+        for ext in thy.args[self.end:]:
+            if ext.is_new_axiom():
+                i, syms = len(self.axioms), self.get_symbols(ext[1])
+                self.axioms.append(ext)
+                self.symbols.append(syms)
+                for s in syms:
+                    self.occ[s] = self.occ.get(s, 0) + 1
+                    self.uses.setdefault(s, []).append(i)
+        self.end, self.digest = n, thy.hexdigest
+        return self
+
+    def get_symbols(self, form):
+        return frozenset(map(
+            lambda x: x.id, form.constants)) - self.prelude
+
+    def select(self, conj, depth, tolerance):
+        occ, symbols, uses = self.occ, self.symbols, self.uses
+        selected, frontier = set(), self.get_symbols(conj)
+        seen, step = set(frontier), 0
+        while frontier and (depth is None or step < depth):
+            next = set()
+            for s in frontier:
+                for i in uses.get(s, ()):
+                    if i in selected:
+                        continue
+                    if occ[s] <= tolerance * min(map(
+                            occ.__getitem__, symbols[i])):
+                        selected.add(i)
+                        next.update(symbols[i] - seen)
+                        seen.update(symbols[i])
+            frontier, step = next, step + 1
+        return selected
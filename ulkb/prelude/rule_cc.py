@@ -0,0 +1,235 @@
+# Copyright (C) 2023 IBM Corp.
+# SPDX-License-Identifier: Apache-2.0
+
+from ..expression import *
+from ..rule import *
+from ..sequent import *
+from .rule_derived import *
+from .rule_primitive import *
+
+__all__ = [
+    'RuleCC',
+]
+
+
+class RuleCC(DerivedRule):
+    r"""Congruence closure.
+
+    .. math::
+       \begin{prooftree}
+       \AXC{$𝛤_1 ⊢ s_1 = t_1$}
+       \AXC{$\cdots$}
+       \AXC{$𝛤_n ⊢ s_n = t_n$}
+       \RL{$\ \small\mathtt{RuleCC}(l = r)$}
+       \TIC{$𝛤 ⊢ l = r$}
+       \end{prooftree}
+
+    Where :math:`l = r` follows from the equations :math:`s_i = t_i` by
+    reflexivity, symmetry, transitivity and congruence, and :math:`𝛤` is
+    the union of the :math:`𝛤_i` of the equations used.
+
+    Applications are the only terms looked into; all other terms
+    (constants, variables, abstractions) are treated as uninterpreted
+    atoms.  The closure is computed using union-find with use lists and
+    the proof is extracted from a proof forest, so deciding the goal takes
+    near-linear time in the size of the input, and the returned theorem
+    is built from :class:`RuleRefl`, :class:`RuleSym`,
+    :class:`RuleTrans` and :class:`RuleMkComb` steps only.
+
+    Parameters:
+       arg1 (:class:`Term`): :math:`l = r`.
+       args (:class:`Sequent`): :math:`𝛤_i ⊢ s_i = t_i`.
+
+    Returns:
+       :class:`Sequent`:
+       :math:`𝛤 ⊢ l = r`.
+
+    Raises:
+       RuleError: `arg1` is not entailed by `args`.
+
+    See also:
+       R. Nieuwenhuis and A. Oliveras, "Fast congruence closure and
+       extensions", Information and Computation 205(4), 2007.
+    """
+    @classmethod
+    def _new(                   # (term, seq1, ..., seqn)
+            cls, arg1, *args):
+        goal = Term.check(arg1, cls.__name__, None, 1)
+        l, r = cls.asserted_unpack_equal(goal)
+        seqs = []
+        for i, arg in enumerate(args, 2):
+            seq = Sequent.check(arg, cls.__name__, None, i)
+            cls.asserted_unpack_equal(seq.conclusion)
+            seqs.append(seq)
+        cc = _CongruenceClosure()
+        for seq in seqs:
+            cc.add_equation(seq)
+        seq = cc.explain(l, r)
+        if seq is None:
+            raise cls.error(f"failed to prove '{goal}'")
+        return seq
+
+    @classmethod
+    def _test(cls, hs, c):
+        return c.is_equal()
+
+
+class _CongruenceClosure:
+    """Congruence closure with explanations.
+
+    Terms are numbered nodes.  The union-find structure is kept flat: each
+    node points directly to its representative, and the smaller class is
+    relabeled on union.  Each representative keeps the use list of the
+    application nodes having an argument in its class, and the lookup
+    table maps pairs of representatives to an application node with these
+    arguments.  Merges are also recorded in a proof forest whose edges
+    are labeled with the input equation or congruence that caused them.
+    """
+
+    __slots__ = (
+        '_app',
+        '_ids',
+        '_label',
+        '_lookup',
+        '_members',
+        '_parent',
+        '_pending',
+        '_rep',
+        '_terms',
+        '_uses',
+    )
+
+    def __init__(self):
+        self._ids = dict()
+        self._terms = []
+        self._app = []          # node -> (f, x) or None
+        self._rep = []          # node -> representative
+        self._members = []      # representative -> nodes in class
+        self._uses = []         # representative -> application nodes
+        self._lookup = dict()   # (rep f, rep x) -> application node
+        self._parent = []       # proof forest
+        self._label = []        # label of edge (node, parent)
+        self._pending = []
+
+    def add_term(self, t):
+        if t in self._ids:
+            return self._ids[t]
+        stack = [(t, False)]
+        while stack:
+            u, expanded = stack.pop()
+            if u in self._ids:
+                continue
+            if u.is_application() and not expanded:
+                stack.append((u, True))
+                stack.append((u[1], False))
+                stack.append((u[0], False))
+                continue
+            n = len(self._terms)
+            self._ids[u] = n
+            self._terms.append(u)
+            self._rep.append(n)
+            self._members.append([n])
+            self._uses.append([])
+            self._parent.append(None)
+            self._label.append(None)
+            if u.is_application():
+                f, x = self._ids[u[0]], self._ids[u[1]]
+                self._app.append((f, x))
+                key = (self._rep[f], self._rep[x])
+                if key in self._lookup:
+                    self._pending.append((n, self._lookup[key], None))
+                else:
+                    self._lookup[key] = n
+                    self._uses[self._rep[f]].append(n)
+                    self._uses[self._rep[x]].append(n)
+            else:
+                self._app.append(None)
+        self._propagate()
+        return self._ids[t]
+
+    def add_equation(self, seq):
+        s, t = seq.conclusion._unpack_equal()
+        a, b = self.add_term(s), self.add_term(t)
+        self._pending.append((a, b, seq))
+        self._propagate()
+
+    def _propagate(self):
+        rep, members, uses = self._rep, self._members, self._uses
+        while self._pending:
+            a, b, label = self._pending.pop()
+            ra, rb = rep[a], rep[b]
+            if ra == rb:
+                continue
+            if len(members[ra]) > len(members[rb]):
+                a, b, ra, rb = b, a, rb, ra
+            self._add_edge(a, b, label)  # reroots the smaller tree
+            for n in members[ra]:
+                rep[n] = rb
+            members[rb].extend(members[ra])
+            members[ra] = None
+            for n in uses[ra]:
+                f, x = self._app[n]
+                key = (rep[f], rep[x])
+                m = self._lookup.get(key)
+                if m is None or m == n:
+                    self._lookup[key] = n
+                    uses[rb].append(n)
+                elif rep[m] != rep[n]:
+                    self._pending.append((n, m, None))
+            uses[ra] = None
+
+    def _add_edge(self, a, b, label):
+        # Makes `a` the root of its proof tree, then links it to `b`.
+        parent, lbl = self._parent, self._label
+        prev, prev_label, n = b, label, a
+        while n is not None:
+            next, next_label = parent[n], lbl[n]
+            parent[n], lbl[n] = prev, prev_label
+            prev, prev_label, n = n, next_label, next
+
+    def explain(self, s, t):
+        a, b = self.add_term(s), self.add_term(t)
+        if self._rep[a] != self._rep[b]:
+            return None
+        return self._explain(a, b) or RuleRefl(s)
+
+    def _explain(self, a, b):
+        # Returns ⊢ a = b, or None if a and b are the same node.
+        if a == b:
+            return None
+        ancestors = set()
+        n = a
+        while n is not None:
+            ancestors.add(n)
+            n = self._parent[n]
+        lca = b
+        while lca not in ancestors:
+            lca = self._parent[lca]
+        seq1 = self._explain_path(a, lca, False)
+        seq2 = self._explain_path(b, lca, True)
+        if seq1 is None or seq2 is None:
+            return seq1 or seq2
+        return RuleTrans(seq1, seq2)
+
+    def _explain_path(self, a, ancestor, reverse):
+        # Returns ⊢ a = ancestor, or ⊢ ancestor = a if `reverse` is true.
+        seq = None
+        while a != ancestor:
+            b, label = self._parent[a], self._label[a]
+            x, y = (b, a) if reverse else (a, b)
+            if label is None:   # congruence
+                (f1, x1), (f2, x2) = self._app[x], self._app[y]
+                step = RuleMkComb(
+                    self._explain(f1, f2) or RuleRefl(self._terms[f1]),
+                    self._explain(x1, x2) or RuleRefl(self._terms[x1]))
+            else:
+                l, _ = label.conclusion._unpack_equal()
+                step = label if self._ids[l] == x else RuleSym(label)
+            if seq is None:
+                seq = step
+            elif reverse:
+                seq = RuleTrans(step, seq)
+            else:
+                seq = RuleTrans(seq, step)
+            a = b
+        return seq
@@ -11,8 +11,10 @@ from .rule_primitive import *
 __all__ = [
     'AlphaConv',
     'BetaConv',
+    'BetaNormConv',
     'Conversion',
     'FailConv',
+    'OnceDepthConv',
     'PassConv',
     'RuleAlpha',
     'RuleAlphaRename',
@@ -25,6 +27,8 @@ __all__ = [
     'RuleSym',
     'RuleTruth',
     'RuleWeaken',
+    'SubConv',
+    'TopDepthConv',
     'TraceConv',
 ]
 
@@ -386,38 +390,17 @@ class Conversion:
 
     def then(self, *convs):
         """<THENC>, <EVERY>"""
-        return self._then_rec(iter(convs))
-
-    def _then_rec(self, it):
-        try:
-            return self._then(next(it)._then_rec(it))
-        except StopIteration:
-            return self
+        return _ThenConv((self,) + convs)
 
     def _then(self, conv):
-        def f(t):
-            seq1 = self(t)
-            seq2 = conv(seq1.conclusion.right)
-            return Rule.RuleTrans(seq1, seq2)
-        return Conversion(f)
+        return _ThenConv((self, conv))
 
     def or_else(self, *convs):
         """<ORELSEC>, <FIRST>"""
-        return self._or_else_rec(iter(convs))
-
-    def _or_else_rec(self, it):
-        try:
-            return self._or_else(next(it)._or_else_rec(it))
-        except StopIteration:
-            return self
+        return _OrElseConv((self,) + convs)
 
     def _or_else(self, conv):
-        def f(t):
-            try:
-                return self(t)
-            except (TypeError, RuleError):
-                return conv(t)
-        return Conversion(f)
+        return _OrElseConv((self, conv))
 
     @property
     def try_(self):
@@ -428,7 +411,34 @@ class Conversion:
     def repeat(self):
         """<REPEATC>"""
         def f(t):
-            return self.then(self.repeat).or_else(PassConv)(t)
+            return _repeat(self, t) or RuleRefl(t)
+        return Conversion(f)
+
+    @property
+    def sub(self):
+        """<SUB_CONV>"""
+        def f(t):
+            gen, seq = _sub_step(t), None
+            while True:
+                try:
+                    u = gen.send(seq)
+                except StopIteration as err:
+                    return err.value or RuleRefl(t)
+                seq = self(u)
+        return Conversion(f)
+
+    @property
+    def once_depth(self):
+        """<ONCE_DEPTH_CONV>"""
+        def f(t):
+            return _DepthEngine(self, _once_depth_step)(t)
+        return Conversion(f)
+
+    @property
+    def top_depth(self):
+        """<TOP_DEPTH_CONV>"""
+        def f(t):
+            return _DepthEngine(self, _top_depth_step)(t)
         return Conversion(f)
 
     @property
@@ -448,12 +458,203 @@ class Conversion:
         return Conversion(f)
 
 
+class _ThenConv(Conversion):
+    """Sequential composition of conversions.
+
+    Nested compositions are flattened, so long chains built by repeated
+    ``>>`` are run by a loop instead of by nested calls.
+    """
+
+    __slots__ = (
+        '_convs',
+    )
+
+    def __init__(self, convs):
+        flat = []
+        for conv in convs:
+            if isinstance(conv, _ThenConv):
+                flat.extend(conv._convs)
+            else:
+                flat.append(conv)
+        self._convs = tuple(flat)
+        super().__init__(self._run)
+
+    def _run(self, t):
+        seq = self._convs[0](t)
+        for conv in self._convs[1:]:
+            seq = RuleTrans(seq, conv(seq.conclusion.right))
+        return seq
+
+
+class _OrElseConv(Conversion):
+    """Alternative composition of conversions (flattened)."""
+
+    __slots__ = (
+        '_convs',
+    )
+
+    def __init__(self, convs):
+        flat = []
+        for conv in convs:
+            if isinstance(conv, _OrElseConv):
+                flat.extend(conv._convs)
+            else:
+                flat.append(conv)
+        self._convs = tuple(flat)
+        super().__init__(self._run)
+
+    def _run(self, t):
+        for conv in self._convs[:-1]:
+            try:
+                return conv(t)
+            except (TypeError, RuleError):
+                pass
+        return self._convs[-1](t)
+
+
+def _trans(seq1, seq2):
+    # Here ``None`` stands for the (omitted) reflexivity theorem.
+    if seq1 is None:
+        return seq2
+    if seq2 is None:
+        return seq1
+    return RuleTrans(seq1, seq2)
+
+
+def _try(conv, t):
+    try:
+        return conv(t)
+    except (TypeError, RuleError):
+        return None
+
+
+def _changed(seq):
+    if seq is None:
+        return None
+    l, r = seq.conclusion._unpack_equal()
+    return None if l == r else seq
+
+
+def _repeat(conv, t):
+    seq = None
+    while True:
+        seq1 = _changed(_try(conv, t))
+        if seq1 is None:
+            return seq
+        seq = _trans(seq, seq1)
+        t = seq1.conclusion.right
+
+
+def _rhs(seq, t):
+    return t if seq is None else seq.conclusion.right
+
+
+def _sub_step(t):
+    # Yields the immediate subterms of `t` to the engine and rebuilds the
+    # equation for `t` from the returned ones using congruence rules.
+    if t.is_application():
+        f, x = t._unpack_application()
+        seq1 = yield f
+        seq2 = yield x
+        if seq1 is None and seq2 is None:
+            return None
+        return RuleMkComb(seq1 or RuleRefl(f), seq2 or RuleRefl(x))
+    elif t.is_abstraction():
+        x, u = t._unpack_abstraction()
+        seq = yield u
+        return None if seq is None else RuleAbs(x, seq)
+    else:
+        return None
+
+
+def _beta_norm_step(conv, t):
+    # Normalizes function and argument first, so that redexes in the
+    # argument are not duplicated by substitution, then contracts the
+    # resulting redex (if any) and normalizes its contractum.
+    seq = yield from _sub_step(t)
+    t = _rhs(seq, t)
+    if t.is_beta_redex():
+        seq1 = RuleBeta(t)
+        seq = _trans(_trans(seq, seq1), (yield seq1.conclusion.right))
+    return seq
+
+
+def _once_depth_step(conv, t):
+    seq = _try(conv, t)
+    if seq is not None:
+        return seq
+    return (yield from _sub_step(t))
+
+
+def _top_depth_step(conv, t):
+    seq = _repeat(conv, t)
+    t = _rhs(seq, t)
+    seq1 = yield from _sub_step(t)
+    if seq1 is not None:
+        seq = _trans(seq, seq1)
+        t = _rhs(seq1, t)
+    seq2 = _changed(_try(conv, t))
+    if seq2 is not None:
+        seq = _trans(seq, seq2)
+        seq = _trans(seq, (yield seq2.conclusion.right))
+    return seq
+
+
+class _DepthEngine:
+    """Runs a depth conversion over a term without recursion.
+
+    Each step is a generator that takes a term, yields the terms whose
+    equations it needs and returns the equation of its own term (or
+    ``None`` if unchanged).  Generators are kept in an explicit stack and
+    the equation obtained for each term is memoized, so shared subterms
+    are converted only once per pass.
+    """
+
+    __slots__ = (
+        '_conv',
+        '_memo',
+        '_step',
+    )
+
+    def __init__(self, conv, step):
+        self._conv = conv
+        self._step = step
+        self._memo = dict()
+
+    def __call__(self, t):
+        return self._run(t) or RuleRefl(t)
+
+    def _run(self, t):
+        memo, conv, step = self._memo, self._conv, self._step
+        stack = [(t, step(conv, t))]
+        value = None
+        while stack:
+            u, gen = stack[-1]
+            try:
+                v = gen.send(value)
+            except StopIteration as err:
+                stack.pop()
+                value = memo[u] = err.value
+                continue
+            if v in memo:
+                value = memo[v]
+            else:
+                stack.append((v, step(conv, v)))
+                value = None
+        return value
+
+
 PassConv = Conversion._pass()
 FailConv = Conversion._fail()
 TraceConv = (lambda msg: PassConv.trace(msg))
 AlphaConv = (lambda y: Conversion(
     lambda t, **kwargs: RuleAlphaRename(y, t, **kwargs)))
 BetaConv = Conversion(RuleBeta)
+BetaNormConv = Conversion(
+    lambda t: _DepthEngine(None, _beta_norm_step)(t))
+SubConv = (lambda conv: conv.sub)
+OnceDepthConv = (lambda conv: conv.once_depth)
+TopDepthConv = (lambda conv: conv.top_depth)
 
 
 # -- Truth -----------------------------------------------------------------
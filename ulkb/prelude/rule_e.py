@@ -20,19 +20,45 @@ class RuleE_Settings(Settings):
     #: Whether to delete the generated temporary file.
     delete = True
 
+    #: Premise selector (e.g., :class:`SInE`) used to try reduced problems
+    #: before the full theory (``None`` means no selection).
+    premise_selection = None
+
 
 class RuleE(PrimitiveRule):
 
+    _oracle = True
+
     @classmethod
     def _new(                   # (form,)
             cls, arg1, **kwargs):
-        import os
-        import subprocess
-        from tempfile import NamedTemporaryFile
-        settings = cls._thy().settings.prelude.rule_e(**kwargs)
+        thy = cls._thy()
+        settings = thy.settings.prelude.rule_e(**kwargs)
         conj = Formula.check(arg1, cls.__name__, None, 1)
         conj_tptp = conj.to_tptp()
-        hyps = cls._thy().to_tptp()
+        tptp, problems = thy._get_tptp(), []
+        if settings.premise_selection is not None:
+            problems = map(
+                lambda axioms: '\n'.join(map(tptp.get_text, axioms)),
+                settings.premise_selection.widen(conj))
+        for hyps in util.chain(problems, [None]):
+            if hyps is None:    # full problem
+                path, count = tptp.sync(
+                    thy, settings.tempdir, settings.delete)
+                hyps = cls._get_include(path) if count else ''
+            if cls._run(settings, hyps, conj_tptp):
+                return {}, conj
+        raise cls.error(f"failed to prove '{conj}'")
+
+    @classmethod
+    def _get_include(cls, path):
+        path = path.replace('\\', '\\\\').replace("'", "\\'")
+        return f"include('{path}').\n"
+
+    @classmethod
+    def _run(cls, settings, hyps, conj_tptp):
+        import subprocess
+        from tempfile import NamedTemporaryFile
         with NamedTemporaryFile(
                 prefix='ulkb_eprover_', suffix='.tptp', mode='w',
                 delete=settings.delete, dir=settings.tempdir) as temp:
@@ -45,9 +71,6 @@ class RuleE(PrimitiveRule):
             ret = subprocess.run(cmd, text=True, capture_output=True)
             status = ret.returncode
             if status == 0 or status == 1:
-                if status == 0:
-                    return {}, conj
-                else:
-                    raise cls.error(f"failed to prove '{conj}'")
+                return status == 0
             else:
                 raise RuntimeError(ret.stderr)
@@ -216,9 +216,9 @@ class RuleAbs(PrimitiveRule):
         seq = Sequent.check(arg2, cls.__name__, None, 2)
         hs, c = seq._unpack_sequent()
         l, r = cls.asserted_unpack_equal(c)
-        for h in hs:
-            if h.has_free_occurrence_of(x):
-                raise cls.error(f"'{x}' occurs free in hypothesis '{h}'")
+        if x in hs.free_variables:
+            h = next(filter(lambda h: h.has_free_occurrence_of(x), hs))
+            raise cls.error(f"'{x}' occurs free in hypothesis '{h}'")
         return hs, Equal(x >> l, x >> r)
 
     @classmethod
@@ -230,7 +230,7 @@ class RuleAbs(PrimitiveRule):
             return False
         x1, _ = l._unpack_abstraction()
         x2, _ = r._unpack_abstraction()
-        return x1 == x2 and not x1.occurs_free_in(hs)
+        return x1 == x2 and x1 not in hs.free_variables
 
 
 class RuleBeta(PrimitiveRule):
@@ -382,8 +382,11 @@ class RuleInstType(PrimitiveRule):
         theta = arg1
         seq = Sequent.check(arg2, cls.__name__, None, 2)
         hs, c = seq._unpack_sequent()
+        if hs.type_variables.isdisjoint(theta):
+            return hs, c.instantiate(theta)  # hs untouched
         return (
-            set(map(lambda x: x.instantiate(theta), hs)),
+            set(map(lambda x: x.instantiate(theta)
+                    if not x.type_variables.isdisjoint(theta) else x, hs)),
             c.instantiate(theta))
 
     @classmethod
@@ -419,8 +422,11 @@ class RuleSubst(PrimitiveRule):
         theta = arg1
         seq = Sequent.check(arg2, cls.__name__, None, 2)
         hs, c = seq._unpack_sequent()
+        if hs.free_variables.isdisjoint(theta):
+            return hs, c.substitute(theta)  # hs untouched
         return (
-            set(map(lambda x: x.substitute(theta), hs)),
+            set(map(lambda x: x.substitute(theta)
+                    if not x.free_variables.isdisjoint(theta) else x, hs)),
             c.substitute(theta))
 
     @classmethod
@@ -0,0 +1,193 @@
+# Copyright (C) 2023 IBM Corp.
+# SPDX-License-Identifier: Apache-2.0
+
+from ..expression import *
+from ..rule import *
+from ..sequent import *
+from ..sequent import _Matcher
+from .rule_derived import *
+from .rule_primitive import *
+
+__all__ = [
+    'RewriteConv',
+]
+
+
+class RewriteConv(Conversion):
+    """Rewriting conversion.
+
+    Rewrites a term with the equational theorems `theorems` until no
+    theorem applies.  The left-hand sides of the theorems are compiled
+    into a discrimination tree, so the theorems that might rewrite a given
+    subterm are found without scanning all of them.  A theorem :math:`𝛤 ⊢
+    p` whose conclusion is not an equation is used as :math:`𝛤 ⊢ p ↔ ⊤`.
+
+    The free variables of the left-hand side of a theorem that do not
+    occur in its hypotheses are pattern variables; they and the type
+    variables not occurring in the hypotheses are instantiated (using
+    :class:`RuleInstType` and :class:`RuleSubst`) to make the left-hand
+    side match the subterm being rewritten.  Pattern variables applied to
+    distinct bound variables are higher-order patterns; the instances of
+    theorems with such variables are beta-reduced.
+
+    Parameters:
+       theorems: Iterable of :class:`Sequent`.
+
+    Returns:
+       A new :class:`RewriteConv`.
+
+    Raises:
+       RuleError: The left-hand side of a theorem is a pattern variable.
+
+    .. code-block:: python
+       :caption: Example:
+
+       a = new_base_type('a')
+       f = new_constant('f', FunctionType(a, a))
+       g = new_constant('g', FunctionType(a, a))
+       c = new_constant('c', a)
+       x = Variable('x', a)
+       conv = RewriteConv([new_axiom(Equal(f(x), g(x)))])
+       print(conv(f(f(c))))
+       # ⊢ f (f c) = g (g c)
+
+       print(conv.stats)
+       # {'rules': 1, 'lookups': 10, 'candidates': 2, 'rewrites': 2}
+
+    See also:
+       `REWRITE_CONV (HOL Light)
+       <https://www.cl.cam.ac.uk/~jrh13/hol-light/HTML/REWRITE_CONV.html>`_.
+    """
+
+    __slots__ = (
+        '_net',
+        '_rules',
+        '_stats',
+    )
+
+    def __init__(self, theorems):
+        self._net = dict()
+        self._rules = []
+        for i, arg in enumerate(theorems, 1):
+            self._add(Sequent.check(arg, self.__class__.__name__, None, i))
+        self._stats = dict.fromkeys(
+            ('lookups', 'candidates', 'rewrites'), 0)
+        super().__init__(self._conv_step.top_depth)
+
+    @property
+    def stats(self):
+        """Rewriting statistics.
+
+        A dictionary with the number of compiled rules (``'rules'``), the
+        number of index lookups (``'lookups'``), the number of candidate
+        rules returned by these lookups (``'candidates'``), and the number
+        of rewrites performed (``'rewrites'``).
+        """
+        return self.get_stats()
+
+    def get_stats(self):
+        """Gets rewriting statistics.
+
+        Returns:
+           Statistics dictionary.
+
+        See also:
+           :attr:`RewriteConv.stats`.
+        """
+        return {'rules': len(self._rules), **self._stats}
+
+    @property
+    def _conv_step(self):
+        return Conversion(self._rewrite)
+
+    def _add(self, seq):
+        hs, c = seq._unpack_sequent()
+        if not c.is_equal():
+            seq = RuleEqTruthIntro(seq)
+            c = seq.conclusion
+        lhs, _ = c._unpack_equal()
+        pvars = lhs.free_variables - hs.free_variables
+        if lhs in pvars:
+            raise RuleError(
+                self.__class__, f'left-hand side is a variable: {lhs}')
+        rule = (
+            len(self._rules), seq, _Matcher(lhs, pvars, hs.type_variables))
+        self._rules.append(rule)
+        node = self._net
+        for key in _pattern_keys(lhs, pvars):
+            node = node.setdefault(key, dict())
+        node.setdefault(None, []).append(rule)
+
+    def _lookup(self, t):
+        self._stats['lookups'] += 1
+        found = []
+        stack = [(self._net, (t, None))]
+        while stack:
+            node, todo = stack.pop()
+            if todo is None:
+                found.extend(node.get(None, ()))
+                continue
+            u, rest = todo
+            if _STAR in node:
+                stack.append((node[_STAR], rest))
+            key, args = _term_key(u)
+            if key in node:
+                for arg in reversed(args):
+                    rest = (arg, rest)
+                stack.append((node[key], rest))
+        found.sort(key=lambda rule: rule[0])
+        self._stats['candidates'] += len(found)
+        return found
+
+    def _rewrite(self, t):
+        for _, seq, matcher in self._lookup(t):
+            thetas = matcher.match(t)
+            if thetas is None:
+                continue
+            tytheta, theta = thetas
+            if tytheta:
+                seq = RuleInstType(tytheta, seq)
+            if theta:
+                seq = RuleSubst(theta, seq)
+            if matcher.higher_order:
+                l, r = seq.conclusion._unpack_equal()
+                if l != t:
+                    seq = RuleTrans(RuleTrans(
+                        BetaNormConv(t), RuleSym(BetaNormConv(l))), seq)
+                seq = RuleTrans(seq, BetaNormConv(r))
+            self._stats['rewrites'] += 1
+            return seq
+        raise RuleError(self.__class__, f'no rule applies to {t}')
+
+
+#: Discrimination-tree key matching any subterm.
+_STAR = '*'
+
+
+def _term_key(t):
+    # Key and children of `t` in the preorder traversal used by the index.
+    # Types are ignored here and checked by _match().
+    if t.is_application():
+        return 'A', t._args
+    elif t.is_abstraction():
+        return 'L', (t[1],)
+    elif t.is_bound_variable():
+        return ('B', t.id), ()
+    elif t.is_variable():
+        return ('V', t.id), ()
+    else:
+        return ('C', t.id), ()
+
+
+def _pattern_keys(t, pvars):
+    keys, stack = [], [t]
+    while stack:
+        u = stack.pop()
+        if u in pvars or (
+                u.is_application() and u._unfold_application()[0] in pvars):
+            keys.append(_STAR)  # includes higher-order patterns
+        else:
+            key, args = _term_key(u)
+            keys.append(key)
+            stack.extend(reversed(args))
+    return keys
@@ -1,6 +1,7 @@
 # Copyright (C) 2023 IBM Corp.
 # SPDX-License-Identifier: Apache-2.0
 
+from .. import util
 from ..rule import *
 from ..settings import Settings
 from .formula import *
@@ -13,19 +14,127 @@ __all__ = [
 class RuleZ3_Settings(Settings):
     """RuleZ3 settings"""
 
+    #: Maximum number of unsat cores kept by theory (``None`` means
+    #: unbounded).
+    core_cache_size = 1024
+
+    #: Premise selector (e.g., :class:`SInE`) used to try reduced problems
+    #: before the full theory (``None`` means no selection).
+    premise_selection = None
+
 
 class RuleZ3(PrimitiveRule, settings=RuleZ3_Settings):
+    r"""Z3 oracle.
+
+    .. math::
+       \begin{prooftree}
+       \AXC{$\mathstrut$}
+       \RL{$\ \small\mathtt{RuleZ3}(p)$}
+       \UIC{$⊢ p$}
+       \end{prooftree}
+
+    Where :math:`p` follows from the axioms of theory according to Z3.
+
+    The axioms are asserted in :attr:`Theory.z3_solver` with tracking
+    literals, and the unsat core of a successful check (the axioms used)
+    is cached by the digests of :math:`p` and of theory.  A cached core,
+    the `core` argument, and the core of the previous success are tried
+    (in this order) before the full theory: each is checked alone against
+    :math:`p`, which is usually much cheaper.  Only cores consisting of
+    axioms of theory are tried.  If setting ``premise_selection`` is set,
+    the selections of its ``widen()`` method are tried next, in the same
+    way.
+
+    The core used is recorded as second argument of the proof of the
+    resulting sequent (see :attr:`Proof.args`); replaying the proof thus
+    tries this core first.
+
+    The solver and the cores are used under a per-theory lock, so
+    concurrent applications over the same theory are serialized.
+
+    Parameters:
+       arg1 (:class:`Formula`): :math:`p`.
+       arg2 (:class:`Formula`): Conjunction of axioms expected to entail
+          :math:`p` (optional).
+       timeout: Timeout of each check (in milliseconds).
+       kwargs: Annotations or settings.
+
+    Returns:
+       :class:`Sequent`:
+       :math:`⊢ p`.
+
+    Raises:
+       RuleError: Z3 failed to prove :math:`p`.
+    """
+
+    _oracle = True
+
+    #: Z3's default (and maximum) timeout.
+    _z3_max_timeout = 4294967295
 
     @classmethod
-    def _new(                   # (form,)
-            cls, arg1, timeout=None, **kwargs):
+    def _new(                   # (form, core)
+            cls, arg1, arg2=None, timeout=None, **kwargs):
         import z3
         conj = Formula.check(arg1, cls.__name__, None, 1)
-        conj_z3 = conj.to_z3()
-        solver = cls._thy().to_z3()
-        if timeout is not None:
-            solver.set('timeout', int(timeout))
-        if solver.check(z3.Not(conj_z3)) == z3.unsat:
-            return {}, conj
+        hint = None
+        if arg2 is not None:
+            hint = Formula.check(arg2, cls.__name__, None, 2)
+            if hint.is_truth():
+                hint = ()
+            elif hint.is_and():
+                hint = hint._unfold_and()
+            else:
+                hint = (hint,)
+        thy = cls._thy()
+        settings = thy.settings.prelude.rule_z3(**kwargs)
+        timeout = cls._z3_max_timeout if timeout is None else int(timeout)
+        z = thy._get_z3()
+        with z.lock:
+            solver = z.sync(thy)
+            if z.cores is None:
+                z.cores = util.LRUCache(settings.core_cache_size)
+            key = (conj.hexdigest, thy.hexdigest)
+            for core in cls._get_candidate_cores(
+                    z, key, hint, conj, settings):
+                core = z.check_core(core, conj, timeout)
+                if core is not None:
+                    break
+            else:
+                conj_z3 = conj.to_z3(cache=z.cache)
+                solver.set('timeout', timeout)
+                solver.push()
+                try:
+                    solver.add(z3.Not(conj_z3))
+                    result = solver.check()
+                    core = z.get_core() if result == z3.unsat else None
+                finally:
+                    solver.pop()
+                if core is None:
+                    raise cls.error(f"failed to prove '{conj}'")
+            z.cores[key] = z.last_core = core
+        return {}, conj
+
+    @classmethod
+    def _get_candidate_cores(cls, z, key, hint, conj, settings):
+        for core in (z.cores.get(key), hint, z.last_core):
+            if core is not None:
+                yield core
+        if settings.premise_selection is not None:
+            for axioms in settings.premise_selection.widen(conj):
+                yield tuple(map(lambda x: x[1], axioms))
+
+    @classmethod
+    def _get_proof_args(cls, args):
+        thy, conj = cls._thy(), args[0]
+        z = thy._get_z3()
+        with z.lock:
+            core = z.cores.get((conj.hexdigest, thy.hexdigest))
+        if core is None:
+            return args
+        elif not core:
+            return conj, Truth()
+        elif len(core) == 1:
+            return conj, core[0]
         else:
-            raise cls.error(f"failed to prove '{conj}'")
+            return conj, And(*core)
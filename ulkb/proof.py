@@ -0,0 +1,601 @@
+# Copyright (C) 2023 IBM Corp.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import sqlite3
+import threading
+from collections.abc import Sequence
+
+from . import error, util
+from .object import Object
+from .rule import RuleError
+from .sequent import _Sequent
+
+__all__ = [
+    'Proof',
+    'ProofError',
+    'ProofStore',
+]
+
+
+class ProofError(error.Error):
+    """Raised when a proof fails to replay.
+
+    Parameters:
+       id: Id of the failed node.
+       reason: Message.
+
+    Returns:
+       A new :class:`ProofError`.
+    """
+
+    def __init__(self, id, reason):
+        super().__init__(f'proof node {id}: {reason}')
+        self.id = id
+        self.reason = reason
+
+
+class Proof:
+    """Reference to a node of a :class:`ProofStore`.
+
+    A proof node records the application of a primitive rule: the rule
+    name, its non-sequent arguments, and the ids of its premises (the
+    proofs of its sequent arguments).
+
+    Parameters:
+       store: :class:`ProofStore`.
+       id: Node id.
+
+    Returns:
+       :class:`Proof`.
+    """
+
+    __slots__ = (
+        'store',
+        'id',
+    )
+
+    def __init__(self, store, id):
+        self.store = store
+        self.id = id
+
+    def __eq__(self, other):
+        return (isinstance(other, Proof)
+                and self.store is other.store and self.id == other.id)
+
+    def __hash__(self):
+        return hash((id(self.store), self.id))
+
+    def __repr__(self):
+        return f'<Proof {self.id} ({self.rule})>'
+
+    @property
+    def rule(self):
+        """Name of the primitive rule."""
+        return self.store[self.id][0]
+
+    @property
+    def args(self):
+        """Rule arguments (sequent arguments are ``None``)."""
+        return self.store[self.id][1]
+
+    @property
+    def premises(self):
+        """Proofs of the sequent arguments."""
+        return tuple(map(
+            lambda x: Proof(self.store, x), self.store[self.id][2]))
+
+    def to_tuple(self):
+        """Converts proof to nested tuples.
+
+        Shared subproofs are converted only once and shared by the
+        resulting tuples.
+
+        Returns:
+           A tuple ``(rule, *args)`` where sequent arguments are replaced
+           by the nested tuples of their proofs.
+        """
+        memo = dict()
+        for i in self.store._get_subproof_ids([self.id]):
+            rule, args, premises = self.store[i]
+            it = iter(premises)
+            memo[i] = (rule, *map(
+                lambda x: memo[next(it)] if x is None else x, args))
+        return memo[self.id]
+
+    def to_jsonl(self, fp):
+        """Writes proof to `fp` in JSON Lines format.
+
+        See :meth:`ProofStore.to_jsonl`.
+        """
+        return self.store.to_jsonl(fp, self)
+
+    def replay(self):
+        """Replays proof.
+
+        See :meth:`ProofStore.replay`.
+        """
+        return self.store.replay(self)[0]
+
+
+class ProofStore(Sequence):
+    """Interned proof DAG.
+
+    A :class:`ProofStore` stores proof nodes as tuples ``(rule, args,
+    premises)`` indexed by consecutive integer ids.  Nodes are interned:
+    adding a rule application that is already in the store returns the
+    existing node, so shared subproofs are stored only once.  Premises
+    are always added before their conclusions, which means that ids are
+    in topological order.
+
+    Rule applications are not added to the in-memory store as they fire.
+    Each derived sequent holds a lightweight record of its rule
+    application, which references the records of the premises but not
+    the premise sequents.  The record is added to the store, together
+    with the records of its premises, only when the proof is requested
+    (e.g., via :attr:`Sequent.proof` or :meth:`ProofStore.check`).
+    Thus the proofs of sequents that are never inspected are freed with
+    the sequents, while nodes added to the store are kept for its
+    lifetime.
+
+    If `path` is given, nodes are appended to an SQLite database as rules
+    fire, instead of being kept in memory.  Only the most recently used
+    nodes are kept in a bounded LRU cache; the others are reloaded from
+    the database on demand (e.g., when :attr:`Sequent.proof` is
+    inspected).  Writes are committed in batches and on
+    :meth:`ProofStore.flush`.  A database is assumed to have a single
+    writing store.
+
+    Additions and replays are serialized by a lock, so a store can be
+    shared by multiple threads.
+
+    Parameters:
+       path: Database file path (``None`` means in-memory).
+       cache_size: Maximum number of cached nodes and replayed sequents
+          (``None`` means unbounded).
+
+    Returns:
+       :class:`ProofStore`.
+    """
+
+    _schema = '''
+    CREATE TABLE IF NOT EXISTS nodes (
+        id INTEGER PRIMARY KEY, key TEXT UNIQUE, rule TEXT, args TEXT,
+        premises TEXT);
+    '''
+
+    #: Number of node insertions per committed batch.
+    _batch_size = 1024
+
+    def __init__(self, path=None, cache_size=4096):
+        self._lock = threading.RLock()
+        self._path = path
+        if path is None:
+            self._db = None
+            self._nodes = []
+            self._ids = dict()
+        else:
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.executescript(self._schema)
+            self._nodes = util.LRUCache(cache_size)  # id -> node
+            self._ids = util.LRUCache(cache_size)    # key -> id
+            (n,) = self._db.execute('SELECT MAX(id) FROM nodes').fetchone()
+            self._len = 0 if n is None else n + 1
+            self._pending = 0
+        self._replayed_ids = dict()  # id -> sequent digest
+        self._replayed = util.LRUCache(cache_size)  # digest -> sequent
+
+    def __getitem__(self, i):
+        if self._db is None:
+            return self._nodes[i]
+        node = self._nodes.get(i)
+        if node is None:
+            row = self._db.execute(
+                'SELECT rule, args, premises FROM nodes WHERE id = ?',
+                (i,)).fetchone()
+            if row is None:
+                raise IndexError('proof node index out of range')
+            rule, args, premises = row
+            node = (rule, tuple(map(_arg_from_json, json.loads(args))),
+                    tuple(json.loads(premises)))
+            self._nodes[i] = node
+        return node
+
+    def __len__(self):
+        return len(self._nodes) if self._db is None else self._len
+
+    @property
+    def path(self):
+        """Database file path or ``None`` (in-memory)."""
+        return self._path
+
+    def flush(self):
+        """Commits pending writes to the database (if any)."""
+        with self._lock:
+            if self._db is not None and self._pending:
+                self._db.commit()
+                self._pending = 0
+
+    def close(self):
+        """Commits pending writes and closes the database (if any)."""
+        with self._lock:
+            if self._db is not None:
+                self.flush()
+                self._db.close()
+
+    def add(self, rule, args):
+        """Adds rule application to store.
+
+        Parameters:
+           rule: :class:`PrimitiveRule` (class).
+           args: Rule arguments.
+
+        Returns:
+           :class:`Proof` or ``None`` (the proof of some premise was not
+           recorded).
+        """
+        premises = []
+        for arg in args:
+            if Object.Sequent.test(arg):
+                proof = arg.proof
+                if proof is None:
+                    return None     # premise proof not recorded
+                premises.append(proof)
+        with self._lock:
+            return Proof(self, self._intern(rule.__name__, tuple(map(
+                lambda x: None if Object.Sequent.test(x) else x, args)),
+                tuple(map(self._get_local_id, premises))))
+
+    def _add_record(self, record):
+        # Adds the proof record of a sequent and the records of its
+        # premises (see PrimitiveRule).
+        with self._lock:
+            stack = [record]
+            while stack:
+                rec = stack[-1]
+                if rec.proof is not None:
+                    stack.pop()
+                    continue
+                todo = [x for x in rec.premises
+                        if x.proof is None and x.theory is rec.theory]
+                if todo:
+                    stack.extend(todo)
+                    continue
+                rec.proof = Proof(self, self._intern(
+                    rec.rule.__name__, rec.args, tuple(map(
+                        lambda x: self._get_local_id(x.get()),
+                        rec.premises))))
+                rec.premises = ()  # no longer needed
+                stack.pop()
+
+    def _get_local_id(self, proof):
+        if proof.store is not self:
+            proof = self._import(proof)
+        return proof.id
+
+    def _intern(self, rule, args, premises):
+        if self._db is not None:
+            return self._intern_db(rule, args, premises)
+        key = (rule, tuple(map(self._get_key, args)), premises)
+        id = self._ids.get(key)
+        if id is None:
+            id = len(self._nodes)
+            self._nodes.append((rule, args, premises))
+            self._ids[key] = id
+        return id
+
+    def _get_key(self, arg):
+        if isinstance(arg, dict):
+            return frozenset(arg.items())
+        else:
+            return arg
+
+    def _intern_db(self, rule, args, premises):
+        args_json = json.dumps(list(map(_arg_to_json, args)))
+        key = util.sha256(json.dumps(
+            [rule, list(map(self._get_key_json, args)), premises],
+            sort_keys=True).encode('utf-8')).hexdigest()
+        id = self._ids.get(key)
+        if id is None:
+            row = self._db.execute(
+                'SELECT id FROM nodes WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                id = row[0]
+            else:
+                id = self._len
+                self._db.execute(
+                    'INSERT INTO nodes VALUES (?, ?, ?, ?, ?)',
+                    (id, key, rule, args_json, json.dumps(premises)))
+                self._len += 1
+                self._pending += 1
+                if self._pending >= self._batch_size:
+                    self.flush()
+                self._nodes[id] = (rule, args, premises)
+            self._ids[key] = id
+        return id
+
+    def _get_key_json(self, arg):
+        if isinstance(arg, dict):
+            return sorted(map(
+                lambda t: json.dumps(t, sort_keys=True),
+                _arg_to_json(arg)))
+        else:
+            return _arg_to_json(arg)
+
+    def _import(self, proof):
+        ids = dict()
+        for i in proof.store._get_subproof_ids([proof.id]):
+            rule, args, premises = proof.store[i]
+            ids[i] = self._intern(
+                rule, args, tuple(map(ids.__getitem__, premises)))
+        return Proof(self, ids[proof.id])
+
+    def _get_subproof_ids(self, ids):
+        stack = list(ids)
+        seen = set(stack)
+        while stack:
+            for i in self[stack.pop()][2]:
+                if i not in seen:
+                    seen.add(i)
+                    stack.append(i)
+        return sorted(seen)     # topological order
+
+    def to_jsonl(self, fp, *proofs):
+        """Writes nodes to `fp` in JSON Lines format.
+
+        Writes one JSON object per line, in topological order, with the
+        fields ``'id'``, ``'rule'``, ``'args'`` (non-sequent arguments as
+        ASTs and sequent arguments as ``null``), and ``'premises'``.
+
+        Parameters:
+           fp: Text stream.
+           proofs: :class:`Proof`'s whose subproofs are written
+              (default: all nodes).
+
+        Returns:
+           The number of nodes written.
+        """
+        if proofs:
+            ids = self._get_subproof_ids(map(lambda x: x.id, proofs))
+        else:
+            ids = range(len(self))
+        n = 0
+        for i in ids:
+            rule, args, premises = self[i]
+            fp.write(json.dumps({
+                'id': i,
+                'rule': rule,
+                'args': list(map(_arg_to_json, args)),
+                'premises': premises,
+            }))
+            fp.write('\n')
+            n += 1
+        return n
+
+    # -- Replay ------------------------------------------------------------
+
+    def replay(self, *proofs, processes=None):
+        """Replays proofs.
+
+        Re-checks `proofs` independently of how they were built, by
+        replaying each primitive rule step in topological order against
+        the top theory.  :class:`RuleAxiom` steps must introduce axioms
+        or definitions of the top theory.
+
+        If `processes` is greater than 1, the part of the DAG below
+        `proofs` not yet replayed is cut into independent subproofs,
+        rooted at `proofs`, at the nodes shared by several conclusions,
+        and wherever a subproof reaches a minimum size (so a single large
+        proof is also split).  The subproofs are distributed over a pool
+        of worker processes in waves following the topological order of
+        the DAG; each one is replayed once, and the results of earlier
+        waves are shipped to later ones instead of being replayed again.
+
+        Replayed sequents are cached by their digest, so subproofs shared
+        with previous calls are not replayed again.
+
+        Parameters:
+           proofs: :class:`Proof`'s of this store.
+           processes: Number of worker processes.
+
+        Returns:
+           The list of replayed sequents.
+
+        Raises:
+           ProofError: Proof failed to replay.
+        """
+        ids = list(map(lambda x: x.id, proofs))
+        with self._lock:
+            if processes is not None and processes > 1:
+                self._replay_parallel(ids, processes)
+            else:
+                self._replay_ids(ids)
+            return list(map(self._get_replayed, ids))
+
+    def check(self, *seqs, processes=None):
+        """Checks the recorded proofs of sequents.
+
+        Parameters:
+           seqs: :class:`Sequent`'s.
+           processes: Number of worker processes.
+
+        Returns:
+           `True`.
+
+        Raises:
+           ProofError: Sequent proof not recorded, failed to replay, or
+              replayed to a different sequent.
+
+        See also:
+           :meth:`ProofStore.replay`.
+        """
+        proofs = []
+        for seq in seqs:
+            proof = seq.proof
+            if proof is None:
+                raise ProofError(None, f"no proof for '{seq}'")
+            if proof.store is not self:
+                with self._lock:
+                    proof = self._import(proof)
+            proofs.append(proof)
+        for seq, proof, res in zip(
+                seqs, proofs, self.replay(*proofs, processes=processes)):
+            if res != seq:
+                raise ProofError(
+                    proof.id, f"replayed '{res}' instead of '{seq}'")
+        return True
+
+    def _get_replayed(self, i):
+        digest = self._replayed_ids.get(i)
+        if digest is not None:
+            return self._replayed.get(digest)
+        return None
+
+    def _set_replayed(self, i, seq):
+        self._replayed_ids[i] = seq.hexdigest
+        self._replayed[seq.hexdigest] = seq
+
+    def _replay_ids(self, ids):
+        axioms, memo = _get_axioms(Object._thy()), dict()
+        for i in self._get_subproof_ids(ids):
+            seq = self._get_replayed(i)
+            if seq is None:
+                rule, args, premises = self[i]
+                it = iter(map(memo.__getitem__, premises))
+                seq = _replay(i, rule, tuple(map(
+                    lambda x: next(it) if x is None else x, args)), axioms)
+                self._set_replayed(i, seq)
+            memo[i] = seq
+
+    def _replay_parallel(self, ids, processes):
+        from concurrent.futures import ProcessPoolExecutor
+        waves = self._get_replay_waves(ids, processes)
+        if not waves:
+            return
+        with ProcessPoolExecutor(
+                processes, initializer=_init_worker,
+                initargs=(Object._thy().to_ast(),)) as pool:
+            for roots in waves:
+                futs = []
+                for k in range(min(processes, len(roots))):
+                    chunk = roots[k::processes]
+                    futs.append((chunk, pool.submit(
+                        _replay_worker, self._get_replay_task(chunk),
+                        chunk)))
+                for chunk, fut in futs:
+                    status, value = fut.result()
+                    if status == 'error':
+                        raise ProofError(*value)
+                    for i, ast in zip(chunk, value):
+                        self._set_replayed(i, Object.from_ast(ast))
+
+    def _get_replay_waves(self, ids, processes):
+        # Cuts the nodes not yet replayed below ids into independent
+        # subproofs, rooted at ids, at nodes shared by several
+        # conclusions, and at nodes whose subproof reaches the minimum
+        # size.  Each subproof is scheduled in the wave following the
+        # last wave of the subproofs it uses.
+        stack = [i for i in set(ids) if self._get_replayed(i) is None]
+        nodes = set(stack)
+        while stack:
+            for i in self[stack.pop()][2]:
+                if i not in nodes and self._get_replayed(i) is None:
+                    nodes.add(i)
+                    stack.append(i)
+        nodes = sorted(nodes)   # topological order
+        parents = dict.fromkeys(nodes, 0)
+        for i in nodes:
+            for j in set(self[i][2]):
+                if j in parents:
+                    parents[j] += 1
+        cut = set(filter(parents.__contains__, ids))
+        cut.update(filter(lambda i: parents[i] > 1, nodes))
+        grain = max(1, len(nodes) // (4 * processes))
+        size, wave, waves = dict(), dict(), []
+        for i in nodes:
+            premises = set(filter(parents.__contains__, self[i][2]))
+            size[i] = 1 + sum(size[j] for j in premises if j not in cut)
+            w = max(map(wave.__getitem__, premises), default=-1)
+            if i in cut or size[i] >= grain:
+                cut.add(i)
+                wave[i] = w = w + 1
+                if w == len(waves):
+                    waves.append([])
+                waves[w].append(i)
+            else:
+                wave[i] = w     # last wave used by the subproof
+        return waves
+
+    def _get_replay_task(self, roots):
+        task, stack, seen = [], list(roots), set(roots)
+        while stack:            # cut at replayed nodes
+            i = stack.pop()
+            seq = self._get_replayed(i)
+            if seq is not None:
+                task.append((i, None, seq.to_ast(), ()))
+                continue
+            rule, args, premises = self[i]
+            task.append((i, rule, list(map(_arg_to_json, args)), premises))
+            for j in premises:
+                if j not in seen:
+                    seen.add(j)
+                    stack.append(j)
+        task.sort()             # topological order
+        return task
+
+
+def _arg_to_json(arg):
+    if Object.test(arg):
+        return arg.to_ast()
+    elif isinstance(arg, dict):
+        return list(util.starmap(
+            lambda k, v: [_arg_to_json(k), _arg_to_json(v)], arg.items()))
+    else:
+        return arg
+
+
+def _arg_from_json(arg):
+    if isinstance(arg, dict):
+        return Object.from_ast(arg)
+    elif isinstance(arg, list):
+        return dict(util.starmap(
+            lambda k, v: (_arg_from_json(k), _arg_from_json(v)), arg))
+    else:
+        return arg
+
+
+def _get_axioms(thy):
+    return set(map(lambda x: x.conclusion, util.chain(
+        thy.axioms_dict.values(), thy.definitions_dict.values())))
+
+
+def _replay(id, rule, args, axioms):
+    cls = getattr(Object, rule, None)
+    if cls is None:
+        raise ProofError(id, f"no such rule '{rule}'")
+    if rule == 'RuleAxiom' and args[0] not in axioms:
+        raise ProofError(id, f"no such axiom '{args[0]}'")
+    try:
+        return _Sequent(*cls._new(*args))
+    except (RuleError, TypeError, ValueError) as err:
+        raise ProofError(id, str(err))
+
+
+def _init_worker(theory_ast):
+    Object.Theory.push(Object.Theory.from_ast(theory_ast))
+
+
+def _replay_worker(task, roots):
+    axioms, memo = _get_axioms(Object._thy()), dict()
+    try:
+        for i, rule, args, premises in task:
+            if rule is None:    # already replayed
+                memo[i] = Object.from_ast(args)
+                continue
+            it = iter(map(memo.__getitem__, premises))
+            memo[i] = _replay(i, rule, tuple(map(
+                lambda x: next(it) if x is None else _arg_from_json(x),
+                args)), axioms)
+    except ProofError as err:
+        return 'error', (err.id, err.reason)
+    return 'ok', [memo[i].to_ast() for i in roots]
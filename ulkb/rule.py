@@ -217,22 +217,80 @@ for name, (f, g, h) in _assertions.items():
 class PrimitiveRule(Rule):
     """Abstract base class for primitive rules."""
 
+    #: Whether the rule consults the axioms of theory by itself, i.e.,
+    #: whether its proofs may use axioms not introduced by
+    #: :class:`RuleAxiom` steps.
+    _oracle = False
+
     def __new__(cls, *args, **kwargs):
         annotations = kwargs.pop('annotations', dict())
         seq = _Sequent(*cls._new(*args, **kwargs), **annotations)
-        if cls._thy().settings.record_proofs:
-            setattr(seq, '_proof', (cls, args))
+        thy = cls._thy()
+        if thy.settings.record_proofs:
+            proof = _ProofRecord.new(thy, cls, cls._get_proof_args(args))
+            if proof is not None:
+                if thy.settings.proof_store_path is not None:
+                    proof.get()  # on-disk store: add as rules fire
+                setattr(seq, '_proof', proof)
         return seq
 
     @abstractclassmethod
     def _new(cls, *args, **kwargs):
         raise NotImplementedError
 
+    @classmethod
+    def _get_proof_args(cls, args):
+        # Arguments recorded in the proof of the resulting sequent.
+        return args
+
     @classmethod
     def test(cls, arg):
         return super().test(arg)
 
 
+class _ProofRecord:
+    """Rule application not yet added to a proof store.
+
+    A record references the records of the premises, but not the premise
+    sequents.  It is added, together with its premises, to the proof
+    store of the theory where the rule was applied only when the proof
+    is requested (see :meth:`Sequent.get_proof`).
+    """
+
+    __slots__ = (
+        'args',
+        'premises',
+        'proof',
+        'rule',
+        'theory',
+    )
+
+    @classmethod
+    def new(cls, theory, rule, args):
+        premises = []
+        for arg in args:
+            if Sequent.test(arg):
+                premise = getattr(arg, '_proof', None)
+                if premise is None:
+                    return None  # premise proof not recorded
+                premises.append(premise)
+        return cls(theory, rule, tuple(map(
+            lambda x: None if Sequent.test(x) else x, args)),
+            tuple(premises))
+
+    def __init__(self, theory, rule, args, premises):
+        self.theory = theory
+        self.rule = rule
+        self.args = args
+        self.premises = premises
+        self.proof = None
+
+    def get(self):
+        if self.proof is None:
+            self.theory.proofs._add_record(self)
+        return self.proof
+
+
 class RuleAxiom(PrimitiveRule):
     r"""Axiom introduction.
 
@@ -19,8 +19,9 @@ class Sequent(Object):
 
     The only way of constructing sequents is using :class:`Rule`'s.
     """
+
     __slots__ = (
-        '_cached_proof',
+        '_cached_matcher',
     )
 
     def _dump(self, _f=lambda x: x.dump()):
@@ -30,7 +31,9 @@ class Sequent(Object):
     def _preprocess_arg(self, arg, i):
         arg = super()._preprocess_arg(arg, i)
         if i == 1:
-            return frozenset(map(
+            if isinstance(arg, _Hypotheses):
+                return arg      # already validated
+            return _Hypotheses(map(
                 lambda x: self._preprocess_arg_formula(self, x, 1), arg))
         elif i == 2:
             return self._preprocess_arg_formula(self, arg, i)
@@ -50,6 +53,40 @@ class Sequent(Object):
         """
         return self[0]
 
+    @property
+    def hypotheses_free_variables(self):
+        """The free variables occurring in sequent hypotheses."""
+        return self.get_hypotheses_free_variables()
+
+    def get_hypotheses_free_variables(self):
+        """Gets the set of free variables occurring in the hypotheses of
+        sequent.
+
+        The result is cached (and shared by the sequents with the same
+        hypotheses set).
+
+        Returns:
+           Set of :class:`Variable`'s.
+        """
+        return self[0].free_variables
+
+    @property
+    def hypotheses_type_variables(self):
+        """The type variables occurring in sequent hypotheses."""
+        return self.get_hypotheses_type_variables()
+
+    def get_hypotheses_type_variables(self):
+        """Gets the set of type variables occurring in the hypotheses of
+        sequent.
+
+        The result is cached (and shared by the sequents with the same
+        hypotheses set).
+
+        Returns:
+           Set of :class:`TypeVariable`'s.
+        """
+        return self[0].type_variables
+
     @property
     def conclusion(self):
         """Sequent conclusion."""
@@ -63,14 +100,311 @@ class Sequent(Object):
         """
         return self[1]
 
-    def _build_proof_cache(self):
-        """Gets the proof certificate associated with sequent."""
-        if not hasattr(self, '_proof'):
+    @property
+    def proof(self):
+        """Sequent proof."""
+        return self.get_proof()
+
+    def get_proof(self):
+        """Gets the proof associated with sequent.
+
+        The proof is added to the proof store of the theory where the
+        sequent was derived (see :attr:`Theory.proofs`) on first request.
+
+        Returns:
+           :class:`Proof` or ``None`` (proof not recorded).
+
+        See also:
+           :attr:`TheorySettings.record_proofs`.
+        """
+        proof = getattr(self, '_proof', None)
+        return proof.get() if proof is not None else None
+
+    def _build_matcher_cache(self):
+        """Gets the compiled matcher of sequent conclusion."""
+        hs, c = self._unpack_sequent()
+        return _Matcher(
+            c, c.free_variables - hs.free_variables, hs.type_variables)
+
+    def match(self, goal):
+        """Finds the instantiations that make conclusion match `goal`.
+
+        The free variables of the conclusion that do not occur in the
+        hypotheses are pattern variables, and so are the type variables
+        that do not occur in the hypotheses.  A pattern variable applied
+        to distinct bound variables (a higher-order pattern) matches any
+        term whose bound variables are among these; it is instantiated by
+        an abstraction over them.
+
+        The conclusion is compiled into a matcher on first use and the
+        matcher is cached in the sequent.
+
+        Parameters:
+           goal: :class:`Term`.
+
+        Returns:
+           A pair (type-variable instantiation, free-variable substitution)
+           if successful; ``None`` otherwise.  The keys of the free-variable
+           substitution are the pattern variables instantiated by the
+           type-variable instantiation.
+
+        See also:
+           :func:`Sequent.match_instantiate`, :func:`Type.match`.
+        """
+        goal = Term.check(goal, 'match', 'goal', 1)
+        return self.matcher.match(goal)
+
+    def match_instantiate(self, goal):
+        """Instantiates sequent so that its conclusion is `goal`.
+
+        Uses :func:`Sequent.match` followed by :class:`RuleInstType` and
+        :class:`RuleSubst`.  If higher-order pattern variables were
+        instantiated, the result is beta-reduced to `goal` using
+        :data:`BetaNormConv`.
+
+        Parameters:
+           goal: :class:`Term`.
+
+        Returns:
+           :class:`Sequent` with conclusion `goal` if successful;
+           ``None`` otherwise.
+
+        .. code-block:: python
+           :caption: Example:
+
+           x = Variable('x', bool)
+           P = Variable('P', FunctionType(bool, bool))
+           seq = new_axiom(Forall(x, P(x)))
+           print(seq.match_instantiate(Forall(x, Or(x, Not(x)))))
+           # ⊢ ∀ x, x ∨ ¬x
+
+        See also:
+           `PART_MATCH (HOL Light)
+           <https://www.cl.cam.ac.uk/~jrh13/hol-light/HTML/PART_MATCH.html>`_.
+        """
+        thetas = self.match(goal)
+        if thetas is None:
             return None
-        cls, args = self._proof
-        return (
-            cls.__name__,
-            *map(lambda x: x.proof if Sequent.test(x) else x, args))
+        return self.matcher.instantiate(self, thetas, goal)
+
+
+class _Matcher:
+    """Compiled matcher.
+
+    The `pattern` is compiled into a sequence of instructions, one for each
+    node of its preorder traversal, except for higher-order patterns which
+    take a single instruction.  Matching executes these instructions
+    against a stack of target terms; each instruction pops one term and
+    pushes its subterms (if any).  Terms are matched in their locally
+    nameless representation, so bound variables are compared by index.
+    """
+
+    __slots__ = (
+        '_code',
+        '_fixed',
+        '_nvars',
+        '_vars',
+        'higher_order',
+    )
+
+    _APP, _ABS, _ATOM, _ATOM_POLY, _FIXED, _BIND, _HO = range(7)
+
+    def __init__(self, pattern, pvars, fixed):
+        self._fixed = fixed
+        self._vars = []
+        self.higher_order = False
+        slots = dict()
+        code = []
+        stack = [(pattern, 0)]
+        while stack:
+            t, depth = stack.pop()
+            if t in pvars:
+                if t not in slots:
+                    slots[t] = len(self._vars)
+                    self._vars.append(t)
+                code.append((self._BIND, slots[t], t.type, depth))
+            elif t.is_application():
+                head, *args = t._unfold_application()
+                if (head in pvars and all(map(
+                        lambda x: x.is_bound_variable(), args))
+                        and len(set(map(lambda x: x.id, args))) == len(args)):
+                    if head not in slots:
+                        slots[head] = len(self._vars)
+                        self._vars.append(head)
+                    self.higher_order = True
+                    code.append((self._HO, slots[head], head.type, tuple(
+                        map(lambda x: (x.id, x.type), args))))
+                else:
+                    code.append((self._APP,))
+                    stack.append((t[1], depth))
+                    stack.append((t[0], depth))
+            elif t.is_abstraction():
+                code.append((self._ABS, t[0].type))
+                stack.append((t[1], depth + 1))
+            elif t.is_variable() and not t.is_bound_variable():
+                code.append((self._FIXED, t))
+            elif t.type.type_variables:
+                code.append((self._ATOM_POLY, type(t), t.id, t.type))
+            else:
+                code.append((self._ATOM, t))
+        self._code = tuple(code)
+        self._nvars = len(self._vars)
+
+    def match(self, goal):
+        tytheta, values = dict(), [None] * self._nvars
+        stack = [goal]
+        pop, push = stack.pop, stack.append
+        for op in self._code:
+            u = pop()
+            opcode = op[0]
+            if opcode == self._APP:
+                if not u.is_application():
+                    return None
+                push(u[1])
+                push(u[0])
+            elif opcode == self._ABS:
+                if (not u.is_abstraction()
+                        or op[1]._match(u[0].type, tytheta) is None):
+                    return None
+                push(u[1])
+            elif opcode == self._ATOM:
+                if u != op[1]:
+                    return None
+            elif opcode == self._ATOM_POLY:
+                _, cls, id, ty = op
+                if (type(u) is not cls or u.id != id
+                        or ty._match(u.type, tytheta) is None):
+                    return None
+            elif opcode == self._FIXED:
+                if u != op[1]:
+                    return None
+            else:
+                if opcode == self._BIND:
+                    _, k, ty, depth = op
+                    if depth and _has_loose_bound_variables(u):
+                        return None
+                else:
+                    _, k, ty, args = op
+                    u = _abstract_bound_variables(u, args)
+                    if u is None:
+                        return None
+                if ty._match(u.type, tytheta) is None:
+                    return None
+                if values[k] is None:
+                    values[k] = u
+                elif values[k] != u:
+                    return None
+        for a in self._fixed.intersection(tytheta):
+            if tytheta[a] != a:
+                return None
+        tytheta = {a: b for a, b in tytheta.items() if a != b}
+        theta = dict()
+        for x, u in zip(self._vars, values):
+            if tytheta:
+                x = x.instantiate(tytheta)
+            if x != u:
+                theta[x] = u
+        return tytheta, theta
+
+    def instantiate(self, seq, thetas, goal):
+        tytheta, theta = thetas
+        if tytheta:
+            seq = seq.RuleInstType(tytheta, seq)
+        if theta:
+            seq = seq.RuleSubst(theta, seq)
+        if self.higher_order and seq[1] != goal:
+            conv = seq._thy().prelude.BetaNormConv
+            seq = seq.RuleEqMP(seq.RuleTrans(
+                conv(seq[1]), seq.RuleSym(conv(goal))), seq)
+        return seq
+
+
+def _has_loose_bound_variables(t):
+    if not t.nameless_variables:
+        return False
+    stack = [(t, 0)]
+    while stack:
+        u, k = stack.pop()
+        if u.is_bound_variable():
+            if u.id >= k:
+                return True
+        elif u.is_application():
+            stack.append((u[0], k))
+            stack.append((u[1], k))
+        elif u.is_abstraction():
+            stack.append((u[1], k + 1))
+    return False
+
+
+def _abstract_bound_variables(t, args):
+    # Abstracts the bound variables (id, type) `args` (loose in `t`) over
+    # `t`.  Returns None if other bound variables are loose in `t`.
+    xs = []
+    for id, ty in args:
+        x = Variable('x', ty).get_variant_not_in([t, *xs])
+        t = t._close(x, id)
+        xs.append(x)
+    if _has_loose_bound_variables(t):
+        return None
+    return Abstraction(*xs, t)
+
+
+class _Hypotheses(frozenset):
+    """Validated set of hypotheses.
+
+    Union and difference of validated sets are validated, so they are
+    not re-checked when used as the hypotheses of a new sequent.  If the
+    result is equal to one of the operands, the operand itself is
+    returned (shared).
+
+    The sets of free variables and type variables occurring in the
+    hypotheses are computed on demand and cached.
+    """
+
+    __slots__ = (
+        '_free_variables',
+        '_type_variables',
+    )
+
+    def __new__(cls, *args):
+        self = super().__new__(cls, *args)
+        self._free_variables = None
+        self._type_variables = None
+        return self
+
+    def __or__(self, other):
+        if not isinstance(other, _Hypotheses):
+            return frozenset.__or__(self, other)
+        if len(self) < len(other):
+            self, other = other, self
+        if other <= self:
+            return self
+        hs = _Hypotheses(frozenset.__or__(self, other))
+        if (self._free_variables is not None
+                and other._free_variables is not None):
+            hs._free_variables = self._free_variables | other._free_variables
+        return hs
+
+    @property
+    def free_variables(self):
+        """The set of free variables occurring in hypotheses."""
+        if self._free_variables is None:
+            self._free_variables = frozenset().union(
+                *map(lambda x: x.free_variables, self))
+        return self._free_variables
+
+    @property
+    def type_variables(self):
+        """The set of type variables occurring in hypotheses."""
+        if self._type_variables is None:
+            self._type_variables = frozenset().union(
+                *map(lambda x: x.type_variables, self))
+        return self._type_variables
+
+    def __sub__(self, other):
+        if self.isdisjoint(other):
+            return self
+        return _Hypotheses(frozenset.__sub__(self, other))
 
 
 class _Sequent(Sequent):
@@ -3,11 +3,16 @@
 
 import re
 
+from .. import util
 from .serializer import Serializer, SerializerSettings
 
 
 class SerializerTPTP_Settings(SerializerSettings):
-    pass
+    """SerializerTPTP settings."""
+
+    #: Maximum number of axiom texts cached by theory (``None`` means
+    #: unbounded).
+    axiom_cache_size = 65536
 
 
 class SerializerTPTP(
@@ -132,7 +137,7 @@ class SerializerTPTP(
 
     def _write_theory(self, obj, parent):
         it = filter(lambda x: x.is_new_axiom(), obj.args_no_prelude)
-        self._write_objects_separated_by('\n', it, obj)
+        self._write('\n'.join(map(obj._get_tptp().get_text, it)))
 
     def _write_fof(self, name, role, obj, parent):
         self._write('fof(')
@@ -145,3 +150,60 @@ class SerializerTPTP(
 
     def _normalize_id(self, id, _re=re.compile(r'\W')):
         return _re.sub('_', str(id))
+
+
+class _TheoryTPTP:
+    """TPTP state of a theory: axiom texts and axiom file.
+
+    The TPTP text of each axiom is cached by the digest of the axiom.  The
+    axiom file holds the texts of the axioms of theory (excluding those of
+    the prelude) up to a given offset and, like the Z3 solver of theory,
+    is valid as long as theory has the same digest at that offset.  The
+    axioms added since the last synchronization are appended to the file;
+    if extensions were removed, the file is rewritten (from cached texts).
+    """
+
+    __slots__ = (
+        'count',
+        'digest',
+        'end',
+        'file',
+        'texts',
+    )
+
+    def __init__(self, axiom_cache_size=None):
+        self.count = 0          # number of axioms in file
+        self.digest = None
+        self.end = None
+        self.file = None
+        self.texts = util.LRUCache(axiom_cache_size)  # digest -> text
+
+    def get_text(self, ext):
+        text = self.texts.get(ext.hexdigest)
+        if text is None:
+            text = self.texts[ext.hexdigest] = ext.to_tptp()
+        return text
+
+    def sync(self, thy, dir=None, delete=True):
+        # Returns the path of the axiom file and its number of axioms.
+        # The file is created on the first call, in `dir`.
+        if self.file is None:
+            from tempfile import NamedTemporaryFile
+            self.file = NamedTemporaryFile(
+                prefix='ulkb_theory_', suffix='.ax', mode='w',
+                delete=delete, dir=dir)
+        n = len(thy.args)
+        if (self.end is None or self.end > n
+                or thy._get_hexdigest_at(self.end) != self.digest):
+            self.file.seek(0)
+            self.file.truncate()
+            self.count, self.end = 0, thy.prelude_offset
+        for ext in thy.args[self.end:]:
+            if ext.is_new_axiom():
+                self.file.write(self.get_text(ext))
+                self.file.write('\n')
+                self.count += 1
+        self.file.flush()
+        self.end, self.digest = n, thy.hexdigest
+        util.logging.debug(f'synced {self.file.name}')
+        return self.file.name, self.count
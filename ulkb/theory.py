@@ -1,21 +1,39 @@
 # Copyright (C) 2023 IBM Corp.
 # SPDX-License-Identifier: Apache-2.0
 
-import importlib
+import contextvars
+import importlib.util
+import json
+import os
 import sys
+import threading
+import types
 
 from . import error, util
 from .expression import *
 from .extension import *
 from .object import *
+from .proof import ProofStore
 from .rule import RuleAxiom
 from .theory_settings import *
 
 __all__ = [
     'Theory',
+    'TheoryError',
 ]
 
 
+class TheoryError(error.Error):
+    pass
+
+
+class _TopTheory:
+    """Descriptor of :attr:`Theory.top` (works on class and instances)."""
+
+    def __get__(self, obj, cls=None):
+        return (cls or type(obj))._stack.get()[-1]
+
+
 class Theory(Object):
     """The state of the logic developments so far.
 
@@ -30,6 +48,11 @@ class Theory(Object):
     It can be changed using :func:`Theory.push` and restored using
     :func:`Theory.pop`.
 
+    The theory stack is context-local (see :mod:`contextvars`): pushing a
+    theory in a thread or :mod:`asyncio` task does not affect the top
+    theory seen by other threads or tasks.  Contexts that never pushed a
+    theory see the initial (root) theory.
+
     Parameters:
        args: Extensions.
        load_prelude: Whether to load the standard prelude.
@@ -40,10 +63,19 @@ class Theory(Object):
     """
 
     #: The top theory.
-    top = None
+    top = _TopTheory()
+
+    #: Theory stack (context-local; initialized at the end of this file).
+    _stack = None
+
+    #: Lock serializing module (re)loading, which is not thread-safe.
+    _load_lock = threading.RLock()
 
-    #: Theory stack.
-    _stack = []
+    #: Lock serializing the creation of proof stores.
+    _proofs_lock = threading.Lock()
+
+    #: Lock serializing the creation of Z3 states.
+    _z3_lock = threading.Lock()
 
     #: Prefix of the prelude module (initialized by __init__.py).
     _prelude_prefix = None
@@ -73,8 +105,7 @@ class Theory(Object):
         Returns:
            `theory`.
         """
-        cls._stack.append(theory)
-        cls.top = theory
+        cls._stack.set((*cls._stack.get(), theory))
         return theory
 
     @classmethod
@@ -87,10 +118,10 @@ class Theory(Object):
         Returns:
            The popped theory.
         """
-        assert len(cls._stack) > 1
-        theory = cls._stack.pop()
-        cls.top = cls._stack[-1]
-        return theory
+        stack = cls._stack.get()
+        assert len(stack) > 1
+        cls._stack.set(stack[:-1])
+        return stack[-1]
 
     __slots__ = (
         '_cached_ids',
@@ -104,14 +135,27 @@ class Theory(Object):
         '_cached_python_type_aliases_dict',
         '_cached_python_type_alias_specs_dict',
         '_cached_type_specs_dict',
+        '_cached_dependents_dict',
+        '_digests',
+        '_frozen',
+        '_load_capture',
         '_prelude',
         '_prelude_offset',
+        '_proofs',
         '_settings',
+        '_tptp',
+        '_z3',
     )
 
     def __init__(self, *args, load_prelude=True, **kwargs):
         super().__init__(**kwargs)
+        self._digests = []
+        self._proofs = None
+        self._tptp = None
+        self._z3 = None
         self._settings = TheorySettings()
+        self._frozen = False
+        self._load_capture = None
         if load_prelude:
             self._prelude = self._load_prelude()
             self._prelude_offset = len(self.args)
@@ -137,6 +181,93 @@ class Theory(Object):
         self._hash = None
         self._hexdigest = None
 
+    #: Digest of the empty theory.
+    _digest_seed = util.sha256(b'Theory').hexdigest()
+
+    def get_hexdigest(self):
+        """Gets theory hexadecimal digest.
+
+        The digest of a theory is a rolling digest chained over the
+        digests of its extensions.  It is updated in constant time when
+        an extension is added and restored in time proportional to the
+        number of extensions removed on :meth:`Theory.reset`.  Theories
+        with the same sequence of extensions have the same digest, across
+        processes.
+
+        Returns:
+           Theory hexadecimal digest.
+        """
+        return self._digests[-1] if self._digests else self._digest_seed
+
+    def _append_extension(self, ext):
+        prev = self.hexdigest
+        self.args.append(ext)
+        self._digests.append(util.sha256(
+            (prev + ext.hexdigest).encode('utf-8')).hexdigest())
+        if self._cached_dependents_dict is not None:
+            self._add_dependent(ext)
+
+    def _pop_extension(self):
+        self._digests.pop()
+        ext = self.args.pop()
+        if self._cached_dependents_dict is not None:
+            self._remove_dependent(ext)
+        return ext
+
+    def _rebuild_digests(self, start):
+        del self._digests[start:]
+        prev = self._get_hexdigest_at(start)
+        for ext in self.args[start:]:
+            prev = util.sha256(
+                (prev + ext.hexdigest).encode('utf-8')).hexdigest()
+            self._digests.append(prev)
+
+    def _build_dependents_dict_cache(self):
+        self._cached_dependents_dict = dict()
+        for ext in self.args:
+            self._add_dependent(ext)
+        return self._cached_dependents_dict
+
+    def _add_dependent(self, ext):
+        for key in self._get_extension_dependencies(ext):
+            self._cached_dependents_dict.setdefault(key, dict())[ext] = None
+
+    def _remove_dependent(self, ext):
+        for key in self._get_extension_dependencies(ext):
+            exts = self._cached_dependents_dict[key]
+            del exts[ext]
+            if not exts:
+                del self._cached_dependents_dict[key]
+
+    def _get_extension_symbols(self, ext):
+        if ext.is_new_type_constructor():
+            return {('type_constructor', ext[0].id)}
+        elif ext.is_new_definition():
+            l, _ = ext[0]._unpack_equal()
+            return {('constant', l.id)}
+        elif (ext.is_new_constant() or ext.is_new_axiom()
+              or ext.is_new_theorem()):
+            return {('constant', ext[0].id)}
+        else:
+            return set()
+
+    def _get_extension_dependencies(self, ext):
+        exps = []
+        for arg in ext.args:
+            if Expression.test(arg):
+                exps.append(arg)
+            elif Object.Sequent.test(arg):
+                exps.extend(arg.hypotheses)
+                exps.append(arg.conclusion)
+        deps = set()
+        for exp in exps:
+            deps.update(map(
+                lambda x: ('type_constructor', x.id),
+                exp.type_constructors))
+            if exp.is_term():
+                deps.update(map(lambda x: ('constant', x.id), exp.constants))
+        return deps - self._get_extension_symbols(ext)
+
     def _build_ids_cache(self):
         return dict()
 
@@ -172,31 +303,106 @@ class Theory(Object):
 
     # -- Modules -----------------------------------------------------------
 
-    def load(self, mod_name):
+    def load(self, mod_name, cache_dir=None):
         """Loads module into theory.
 
+        If `cache_dir` is given (or :attr:`TheorySettings.load_cache_dir`
+        is set), the extensions produced by the execution of the module
+        are stored in an on-disk cache keyed by the module source digest,
+        the digest of theory before the load (see
+        :attr:`Theory.hexdigest`), and the ulkb version.  Subsequent loads
+        of the same module source into a theory with the same digest
+        replay the cached extensions in bulk, without re-checking them,
+        and skip the execution of the module entirely.
+
+        Only the source of the module itself is digested: if the module
+        imports or loads other modules whose source changes, the cache
+        entry must be removed manually.
+
         Parameters:
            mod_name: Module name.
+           cache_dir: Cache directory.
 
         Returns:
-           The loaded module.
+           The loaded module.  If the extensions were replayed from the
+           cache, the module is not executed and the result is the
+           previously imported module or ``None`` (not imported).
         """
-        with self:
+        cache_dir = cache_dir or self.settings.load_cache_dir
+        path = self._get_load_cache_path(mod_name, cache_dir)
+        if path is None:
+            return self._load(mod_name)
+        exts = self._read_load_cache(path)
+        if exts is not None:
+            util.logging.debug(f'replaying {path}')
+            for ext in exts:
+                self._extend_trusted(ext)
+            return sys.modules.get(mod_name)
+        outer, self._load_capture = self._load_capture, []
+        try:
+            mod = self._load(mod_name)
+            exts = self._load_capture
+        finally:
+            self._load_capture = outer
+        if outer is not None:
+            outer.extend(exts)
+        self._write_load_cache(path, exts)
+        return mod
+
+    def _load(self, mod_name):
+        with self._load_lock, self:
             if mod_name in sys.modules:
                 importlib.reload(sys.modules[mod_name])
             else:
                 importlib.import_module(mod_name)
         return sys.modules[mod_name]
 
+    def _get_load_cache_path(self, mod_name, cache_dir):
+        from . import __version__
+        if cache_dir is None:
+            return None
+        spec = importlib.util.find_spec(mod_name)
+        if spec is None or not spec.has_location:
+            return None
+        digest = util.sha256(__version__.encode('utf-8'))
+        digest.update(self.hexdigest.encode('utf-8'))
+        digest.update(util.Path(spec.origin).read_bytes())
+        return util.Path(cache_dir) / f'{digest.hexdigest()}.json'
+
+    def _read_load_cache(self, path):
+        try:
+            with open(path, encoding='utf-8') as fp:
+                return list(map(Extension.from_ast, json.load(fp)))
+        except FileNotFoundError:
+            return None
+        except (ValueError, error.Error) as err:
+            util.logging.debug(f'ignoring {path}: {err}')
+            return None
+
+    def _write_load_cache(self, path, exts):
+        try:
+            text = json.dumps(list(map(lambda x: x.to_ast(), exts)))
+        except (TypeError, ValueError) as err:  # not JSON-compatible
+            util.logging.debug(f'not caching {path}: {err}')
+            return
+        if list(map(Extension.from_ast, json.loads(text))) != exts:
+            util.logging.debug(f'not caching {path}: lossy conversion')
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_suffix(f'.{os.getpid()}.tmp')
+        temp.write_text(text, encoding='utf-8')
+        os.replace(temp, path)  # atomic
+
     # -- Prelude -----------------------------------------------------------
 
     def _load_prelude(self):
         from types import ModuleType
-        mod = self.load(self._prelude_prefix + '.prelude')
-        for k in dir(mod):
-            v = getattr(mod, k)
-            if isinstance(v, ModuleType):
-                self.load(v.__name__)
+        with self._load_lock:
+            mod = self._load(self._prelude_prefix + '.prelude')
+            for k in dir(mod):
+                v = getattr(mod, k)
+                if isinstance(v, ModuleType):
+                    self._load(v.__name__)
         return mod
 
     @property
@@ -238,6 +444,133 @@ class Theory(Object):
         """
         return self[self._prelude_offset:]
 
+    # -- Proofs ------------------------------------------------------------
+
+    @property
+    def proofs(self):
+        """Theory proof store."""
+        return self.get_proofs()
+
+    def get_proofs(self):
+        """Gets theory proof store.
+
+        The proofs of the sequents derived while theory is the top theory
+        are recorded in this store (if
+        :attr:`TheorySettings.record_proofs` is set) when they are first
+        requested.  The store is kept
+        on disk if :attr:`TheorySettings.proof_store_path` is set;
+        changing this setting replaces the store.
+
+        Returns:
+           :class:`ProofStore`.
+        """
+        path = self.settings.proof_store_path
+        with self._proofs_lock:
+            if self._proofs is None or self._proofs.path != path:
+                if self._proofs is not None:
+                    self._proofs.flush()
+                self._proofs = ProofStore(path)
+            return self._proofs
+
+    # -- Solvers -----------------------------------------------------------
+
+    @property
+    def z3_solver(self):
+        """Theory incremental Z3 solver."""
+        return self.get_z3_solver()
+
+    def get_z3_solver(self):
+        """Gets theory incremental Z3 solver.
+
+        The solver asserts the axioms of theory (excluding those of the
+        prelude) and is kept across calls.  It is synchronized with theory
+        on each call: the axioms added since the previous call are
+        asserted in a new solver scope, and the scopes covering
+        extensions that were removed (by :meth:`Theory.reset`,
+        :meth:`Theory.retract` or :meth:`Theory.apply`) are popped first.
+        Removed extensions are detected by comparing the digest of theory
+        at the end of each scope (see :attr:`Theory.hexdigest`).  Axioms
+        are asserted with tracking literals, so the unsat core of a check
+        identifies the axioms it used.
+
+        Goals should be checked in a scope of their own, i.e., between
+        ``push()`` and ``pop()``, or using ``check(assumptions)``.  The
+        solver is shared: :class:`RuleZ3` and :meth:`Theory.entails_many`
+        serialize their use of it by a per-theory lock, so it must not
+        be used directly while other threads use them over theory.
+
+        Returns:
+           :class:`z3.Solver`.
+
+        See also:
+           :class:`RuleZ3`.
+        """
+        z = self._get_z3()
+        with z.lock:
+            return z.sync(self)
+
+    def entails_many(self, formulas, timeout=None, processes=None):
+        """Tests whether formulas are entailed by theory.
+
+        The axioms of theory are loaded into :attr:`Theory.z3_solver` once
+        and each formula and its negation are then checked in a single
+        solver scope, under assumption literals of their own.  If
+        `processes` is greater than 1, the formulas are split among a pool
+        of worker processes, each holding a copy of theory and its own
+        solver.
+
+        Parameters:
+           formulas: Iterable of :class:`Formula`.
+           timeout: Timeout of each check (in milliseconds).
+           processes: Number of worker processes.
+
+        Returns:
+           A list of pairs ``(result, seconds)``, one per formula, where
+           `result` is ``True`` (the formula is entailed), ``False``
+           (refuted, i.e., its negation is entailed), or ``None``
+           (neither, or unknown), and `seconds` is the time taken by the
+           checks.
+
+        See also:
+           :class:`RuleZ3`.
+        """
+        forms = [
+            self.Formula.check(form, 'entails_many', 'formulas', i)
+            for i, form in enumerate(formulas, 1)]
+        timeout = (self.RuleZ3._z3_max_timeout
+                   if timeout is None else int(timeout))
+        if processes is None or processes <= 1 or len(forms) <= 1:
+            return self._get_z3().entails(self, forms, timeout)
+        from concurrent.futures import ProcessPoolExecutor
+
+        from .converter.z3 import _entails_worker, _init_entails_worker
+        size = -(-len(forms) // processes)
+        chunks = [forms[i:i + size] for i in range(0, len(forms), size)]
+        with ProcessPoolExecutor(
+                len(chunks), initializer=_init_entails_worker,
+                initargs=(self.to_ast(),)) as pool:
+            futs = [
+                pool.submit(_entails_worker, list(map(
+                    lambda x: x.to_ast(), chunk)), timeout)
+                for chunk in chunks]
+            return list(util.chain(*(fut.result() for fut in futs)))
+
+    def _get_tptp(self):
+        if self._tptp is None:
+            from .serializer.tptp import _TheoryTPTP
+            self._tptp = _TheoryTPTP(
+                self.settings.serializer.tptp.axiom_cache_size)
+        return self._tptp
+
+    def _get_z3(self):
+        if self._z3 is None:
+            from .converter.z3 import _TheoryZ3
+            with self._z3_lock:
+                if self._z3 is None:
+                    self._z3 = _TheoryZ3(
+                        self.settings.converter.z3.simplify_cache_size)
+        return self._z3
+
     # -- Settings ----------------------------------------------------------
 
     @property
@@ -273,6 +606,7 @@ class Theory(Object):
 
         Raises:
            ExtensionError: `ext` cannot be added to theory.
+           TheoryError: Theory is frozen.
 
         See also:
            :func:`extend`.
@@ -281,8 +615,9 @@ class Theory(Object):
 
     def _extend(
             self, ext, func_name=None, arg_name=None, arg_position=None):
+        self._check_not_frozen()
         if ext in self.args:
-            return ext          # nothing to do
+            return self._capture_extension(ext)  # nothing else to do
         if ext.id is not None and ext.id in self.ids:
             raise ext.error(f"extension '{ext.id}' already exists")
         if ext.is_new_type_constructor():
@@ -298,8 +633,13 @@ class Theory(Object):
             (form,) = ext._unpack_new_definition()
             l, r = form._unpack_equal()
             self._check_extension_types(ext, form)
-            self._cache_extension(NewConstant(Constant(l.id, l.type)))
-            self._check_extension_constants(ext, r)
+            const = NewConstant(Constant(l.id, l.type))
+            self._cache_extension(const)
+            try:
+                self._check_extension_constants(ext, r)
+            except BaseException:
+                self._uncache_extension(const)
+                raise
         elif ext.is_new_theorem():
             const, seq = ext._unpack_extension()
             for form in util.chain(seq.hypotheses, [seq.conclusion]):
@@ -317,7 +657,29 @@ class Theory(Object):
         else:
             error.should_not_get_here()
         self._cache_extension(ext)
-        self.args.append(ext)
+        self._append_extension(ext)
+        return self._capture_extension(ext)
+
+    def _extend_trusted(self, ext):
+        self._check_not_frozen()
+        if ext.id is None and ext in self.args:
+            return self._capture_extension(ext)  # nothing else to do
+        elif ext.id is not None and ext.id in self.ids:
+            if self.ids[ext.id] != ext:
+                raise ext.error(f"extension '{ext.id}' already exists")
+            return self._capture_extension(ext)  # nothing else to do
+        if ext.is_new_axiom() or ext.is_new_theorem():
+            self._cache_extension(NewConstant(ext[0]))
+        elif ext.is_new_definition():
+            l, _ = ext[0]._unpack_equal()
+            self._cache_extension(NewConstant(Constant(l.id, l.type)))
+        self._cache_extension(ext)
+        self._append_extension(ext)
+        return self._capture_extension(ext)
+
+    def _capture_extension(self, ext):
+        if self._load_capture is not None:
+            self._load_capture.append(ext)  # see load()
         return ext
 
     def _check_extension_constants(self, ext, term):
@@ -596,6 +958,56 @@ class Theory(Object):
         """
         return self._extend(NewPythonTypeAlias(arg1, arg2, arg3, **kwargs))
 
+    # -- Freezing ----------------------------------------------------------
+
+    def freeze(self):
+        """Makes theory read-only.
+
+        Eagerly computes all indexes and caches of theory (including its
+        hash) and makes them immutable.  Subsequent attempts to extend
+        or reset the theory fail.
+
+        A frozen theory is never mutated by queries, so it can be shared
+        by multiple threads without locking and its memory pages remain
+        shared (copy-on-write) in forked worker processes.  (Its proof
+        store is the exception: it is updated under a lock when proofs
+        of sequents derived in theory are requested.)
+
+        Returns:
+           `self`.
+        """
+        if self._frozen:
+            return self
+        for attr in self._cached:
+            v = getattr(self, 'get_' + attr[8:])()
+            if isinstance(v, set):
+                v = frozenset(v)
+            elif isinstance(v, dict):
+                v = types.MappingProxyType(v)
+            setattr(self, attr, v)
+        self._args = tuple(self._args)
+        self._digests = tuple(self._digests)
+        hash(self)
+        self._frozen = True
+        return self
+
+    @property
+    def frozen(self):
+        """Whether theory is frozen."""
+        return self.is_frozen()
+
+    def is_frozen(self):
+        """Tests whether theory is frozen.
+
+        Returns:
+           ``True`` if successful; ``False`` otherwise.
+        """
+        return self._frozen
+
+    def _check_not_frozen(self):
+        if self._frozen:
+            raise TheoryError('theory is frozen')
+
     # -- Removing extensions -----------------------------------------------
 
     def reset(self, arg=None):
@@ -624,31 +1036,228 @@ class Theory(Object):
 
         Raises:
            LookupError: `arg` not in theory.
+           TheoryError: Theory is frozen.
         """
+        self._check_not_frozen()
         if arg is None:
             start = self.prelude_offset
-        elif isinstance(arg, int):
+        else:
+            start = self._get_extension_offset(arg)
+        if start < self.prelude_offset:
+            self._prelude_offset = start
+        n = len(self.args)
+        for i in range(n - 1, start - 1, -1):
+            ext = self.args[i]
+            self._uncache_extension(ext)
+            self._pop_extension()
+        return n - start
+
+    def _get_extension_offset(self, arg):
+        if isinstance(arg, int):
             if arg >= 0:
-                start = arg
+                return arg
             else:
-                start = len(self.args) + arg
+                return len(self.args) + arg
         elif Object.test(arg):
             if Extension.test(arg) and arg in self.args:
-                start = self.args.index(arg)
+                return self.args.index(arg)
             elif hasattr(arg, 'id'):
-                start = self.args.index(self.lookup_extension(arg.id))
+                return self.args.index(self.lookup_extension(arg.id))
             else:
                 raise LookupError(f"no such extension '{arg}'")
         else:                   # arg is an id
-            start = self.args.index(self.lookup_extension(arg))
-        if start < self.prelude_offset:
-            self._prelude_offset = start
-        n = len(self.args)
-        for i in range(n - 1, start - 1, -1):
-            ext = self.args[i]
-            self._uncache_extension(ext)
-            self.args.pop()
-        return n - start
+            return self.args.index(self.lookup_extension(arg))
+
+    def retract(self, arg, cascade=True):
+        """Removes extension `arg` and the extensions depending on it.
+
+        An extension depends on another if it mentions a type constructor
+        or constant introduced by the other (transitively).  A theorem
+        also depends on the axioms and definitions preceding it, unless
+        its recorded proof (see :attr:`Sequent.proof`) shows otherwise,
+        i.e., unless the proof is recorded, does not introduce them, and
+        does not use oracles such as :class:`RuleZ3`.  Unlike
+        :meth:`Theory.reset`, extensions added after `arg` that do not
+        depend on it are kept.
+
+        The dependency graph is built on first use and then maintained
+        incrementally, so the index and cache updates are proportional to
+        the number of extensions removed.
+
+        If `arg` is an id, retracts the extension introducing the object
+        with id `arg`.  If `arg` is an object, retracts the extension
+        introducing `arg`.  If `arg` is an integer, retracts the
+        extension at offset `arg`.
+
+        Parameters:
+           arg: Id, :class:`Object`, or int.
+           cascade: Whether to remove the dependents of `arg`.
+
+        Returns:
+           The list of extensions removed (in theory order).
+
+        Raises:
+           LookupError: `arg` not in theory.
+           TheoryError: `arg` has dependents and `cascade` is ``False``;
+              or theory is frozen.
+        """
+        self._check_not_frozen()
+        ext = self.args[self._get_extension_offset(arg)]
+        dependents = self.dependents_dict
+        removed, queue = {ext: None}, [ext]
+        while queue:
+            while queue:
+                for key in self._get_extension_symbols(queue.pop()):
+                    for dep in dependents.get(key, ()):
+                        if dep not in removed:
+                            removed[dep] = None
+                            queue.append(dep)
+            queue = self._get_retracted_theorems(removed)
+            removed.update(dict.fromkeys(queue))
+        if not cascade and len(removed) > 1:
+            raise TheoryError(
+                f"extension '{ext.id or ext}' has dependents")
+        start, args, prelude_offset = None, [], self._prelude_offset
+        for i, x in enumerate(self.args):
+            if x in removed:
+                start = i if start is None else start
+                prelude_offset -= i < self._prelude_offset
+            else:
+                args.append(x)
+        removed = [x for x in self.args[start:] if x in removed]
+        for x in reversed(removed):
+            self._uncache_extension(x)
+            self._remove_dependent(x)
+        self._args = args
+        self._prelude_offset = prelude_offset
+        self._rebuild_digests(start)
+        return removed
+
+    def _get_retracted_theorems(self, removed):
+        # Theorems not in removed whose proofs may use the axioms or
+        # definitions in removed.
+        start, forms = None, set()
+        for i, x in enumerate(self.args):
+            if x in removed:
+                if x.is_new_axiom():
+                    forms.add(self.axioms_dict[x.id].conclusion)
+                elif x.is_new_definition():
+                    forms.add(self.definitions_dict[x.id].conclusion)
+                else:
+                    continue
+                start = i if start is None else start
+        if start is None:
+            return []
+        return [x for x in self.args[start + 1:]
+                if x.is_new_theorem() and x not in removed
+                and self._theorem_may_use(x, forms)]
+
+    def _theorem_may_use(self, ext, forms):
+        proof = ext[1].proof
+        if proof is None:
+            return True         # not recorded
+        store = proof.store
+        for i in store._get_subproof_ids([proof.id]):
+            rule, args, _ = store[i]
+            if rule == 'RuleAxiom':
+                if args[0] in forms:
+                    return True
+            elif getattr(getattr(Object, rule, None), '_oracle', True):
+                return True
+        return False
+
+    # -- Synchronization ---------------------------------------------------
+
+    def diff(self, other):
+        """Computes the delta from theory to `other`.
+
+        The delta removes the extensions of theory after its longest
+        common prefix with `other` and adds the remaining extensions of
+        `other`.  The common prefix is found by bisecting the rolling
+        digests (see :meth:`Theory.get_hexdigest`), so the delta is
+        computed in time linear in the change.
+
+        The delta is a JSON-compatible dictionary with the following
+        fields:
+
+        - ``'offset'``: length of the common prefix.
+        - ``'base'``: digest of the common prefix.
+        - ``'removed'``: digests of the removed extensions.
+        - ``'added'``: ASTs of the added extensions.
+        - ``'target'``: digest of `other`.
+
+        Parameters:
+           other: :class:`Theory`.
+
+        Returns:
+           Delta.
+
+        See also:
+           :meth:`Theory.apply`.
+        """
+        other = Theory.check(other, 'diff', 'other', 1)
+        lo, hi = 0, min(len(self.args), len(other.args))
+        while lo < hi:          # largest common prefix
+            mid = (lo + hi + 1) // 2
+            if self._get_hexdigest_at(mid) == other._get_hexdigest_at(mid):
+                lo = mid
+            else:
+                hi = mid - 1
+        return {
+            'offset': lo,
+            'base': self._get_hexdigest_at(lo),
+            'removed': [x.hexdigest for x in self.args[lo:]],
+            'added': [x.to_ast() for x in other.args[lo:]],
+            'target': other.hexdigest,
+        }
+
+    def apply(self, delta):
+        """Patches theory with `delta`.
+
+        Only the removed extensions are uncached and only the added ones
+        are checked and cached; the rest of the theory is left untouched.
+        If the delta cannot be applied, the theory is restored to its
+        previous state.
+
+        Parameters:
+           delta: Delta (see :meth:`Theory.diff`).
+
+        Returns:
+           `self`.
+
+        Raises:
+           ExtensionError: Added extension cannot be added to theory.
+           TheoryError: Delta does not apply to theory.
+        """
+        self._check_not_frozen()
+        try:
+            offset, base, removed, added, target = map(
+                delta.__getitem__,
+                ('offset', 'base', 'removed', 'added', 'target'))
+        except (KeyError, TypeError):
+            raise TheoryError('invalid delta')
+        if (offset > len(self.args)
+                or self._get_hexdigest_at(offset) != base
+                or [x.hexdigest for x in self.args[offset:]] != removed):
+            raise TheoryError('delta does not apply to theory')
+        old = self.args[offset:]
+        prelude_offset = self._prelude_offset
+        self.reset(offset)
+        try:
+            for ext in map(Extension.from_ast, added):
+                self._extend(ext)
+            if self.hexdigest != target:
+                raise TheoryError('delta target digest mismatch')
+        except BaseException:
+            self.reset(offset)
+            for ext in old:
+                self._extend_trusted(ext)
+            self._prelude_offset = prelude_offset
+            raise
+        return self
+
+    def _get_hexdigest_at(self, i):
+        return self._digests[i - 1] if i > 0 else self._digest_seed
 
     # -- Querying extensions -----------------------------------------------
 
@@ -911,4 +1520,5 @@ class Theory(Object):
             print(i, ext, sep=sep, **kwargs)
 
 
-Theory.push(Theory(load_prelude=False))
+Theory._stack = contextvars.ContextVar(
+    'ulkb_theory_stack', default=(Theory(load_prelude=False),))
@@ -34,9 +34,18 @@ class TheorySettings(Settings):
     #: Prefix of generated ids.
     generated_id_prefix = '_'
 
+    #: Directory of the cache used by :meth:`Theory.load`
+    #: (`None` means no caching).  Cache entries are keyed by the source
+    #: of the loaded module only, not by that of its dependencies.
+    load_cache_dir = None
+
     #: Whether to record proofs.
     record_proofs = True
 
+    #: Path of the database of the proof store of theory
+    #: (`None` means in-memory).
+    proof_store_path = None
+
     #: Whether to override :meth:`Object.__repr__`.
     override_object_repr = True
 
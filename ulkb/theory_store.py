@@ -0,0 +1,427 @@
+# Copyright (C) 2023 IBM Corp.
+# SPDX-License-Identifier: Apache-2.0
+
+import contextlib
+import json
+import sqlite3
+from collections.abc import Sequence
+
+from . import error, util
+from .expression import *
+from .extension import *
+from .object import *
+from .rule import RuleAxiom
+
+__all__ = [
+    'TheoryStore',
+]
+
+
+class TheoryStore(Sequence):
+    """Persistent on-disk store of theory extensions.
+
+    A :class:`TheoryStore` keeps a sequence of extensions in an SQLite
+    database together with indexes by id, class, introduced symbol (type
+    constructor, constant, axiom, definition, or theorem), and occurring
+    constants and type constructors.
+
+    Extensions are materialized into :class:`Extension` objects only when
+    accessed, i.e., via indexing, iteration, the ``lookup_*`` methods, or
+    :meth:`TheoryStore.enumerate_extensions`.  The most recently accessed
+    ones are kept alive in a bounded LRU cache.
+
+    Extensions are checked as in :meth:`Theory.extend` before being
+    stored; symbols introduced by the prelude of the top theory are
+    assumed to be defined.  Each addition runs in an immediate
+    transaction, so multiple connections can write to the same database
+    file.
+
+    Parameters:
+       path: Database file path (``':memory:'`` means in-memory).
+       cache_size: Maximum number of live extensions (``None`` means
+          unbounded).
+
+    Returns:
+       :class:`TheoryStore`.
+    """
+
+    _schema = '''
+    CREATE TABLE IF NOT EXISTS extensions (
+        pos INTEGER PRIMARY KEY, id TEXT, class TEXT, ast TEXT);
+    CREATE INDEX IF NOT EXISTS extensions_id ON extensions (id);
+    CREATE INDEX IF NOT EXISTS extensions_class ON extensions (class);
+    CREATE TABLE IF NOT EXISTS symbols (
+        kind TEXT, id TEXT, pos INTEGER, PRIMARY KEY (kind, id));
+    CREATE TABLE IF NOT EXISTS occurrences (
+        kind TEXT, id TEXT, pos INTEGER);
+    CREATE INDEX IF NOT EXISTS occurrences_id ON occurrences (kind, id);
+    '''
+
+    @classmethod
+    def from_theory(cls, theory, path=':memory:', **kwargs):
+        """Creates store containing the non-prelude extensions of
+        `theory`.
+
+        Parameters:
+           theory: :class:`Theory`.
+           path: Database file path.
+           kwargs: Options to :class:`TheoryStore`.
+
+        Returns:
+           :class:`TheoryStore`.
+        """
+        store = cls(path, **kwargs)
+        store.extend(theory.args_no_prelude)
+        return store
+
+    def __init__(self, path=':memory:', cache_size=1024):
+        self._db = sqlite3.connect(str(path))
+        self._db.create_function(
+            'regexp', 2, lambda x, y: y is not None and bool(
+                util.compile(x).match(y)), deterministic=True)
+        self._db.executescript(self._schema)
+        self._cache = util.LRUCache(cache_size)
+        self._prelude_symbols = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, err_type, err_val, err_bt):
+        self.close()
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(map(self._materialize, range(len(self))[i]))
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('extension index out of range')
+        return self._materialize(i)
+
+    def __len__(self):
+        (pos,) = self._db.execute(
+            'SELECT MAX(pos) FROM extensions').fetchone()
+        return 0 if pos is None else pos + 1
+
+    def close(self):
+        """Closes the underlying database."""
+        self._db.close()
+
+    def _materialize(self, pos):
+        ext = self._cache.get(pos)
+        if ext is None:
+            (ast,) = self._db.execute(
+                'SELECT ast FROM extensions WHERE pos = ?',
+                (pos,)).fetchone()
+            ext = Extension.from_ast(json.loads(ast))
+            self._cache[pos] = ext
+        return ext
+
+    # -- Adding extensions -------------------------------------------------
+
+    def add(self, ext):
+        """Adds extension to store.
+
+        Parameters:
+           ext: :class:`Extension`.
+
+        Returns:
+           `ext`.
+
+        Raises:
+           ExtensionError: `ext` cannot be added to store.
+        """
+        ext = Extension.check(ext, 'add', 'ext', 1)
+        with self._transaction():
+            return self._add(ext)
+
+    def extend(self, exts):
+        """Adds extensions to store (in a single transaction).
+
+        Parameters:
+           exts: Iterable of :class:`Extension`'s.
+        """
+        with self._transaction():
+            for i, ext in enumerate(exts, 1):
+                self._add(Extension.check(ext, 'extend', 'exts', i))
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._db:          # commit or rollback
+            self._db.execute('BEGIN IMMEDIATE')
+            start = len(self)
+            try:
+                yield
+            except BaseException:
+                # drop the extensions of the rolled-back positions
+                for pos in range(start, len(self)):
+                    self._cache.pop(pos)
+                raise
+
+    def _add(self, ext):
+        if ext.id is not None and self._db.execute(
+                'SELECT 1 FROM extensions WHERE id = ?',
+                (ext.id,)).fetchone():
+            raise ext.error(f"extension '{ext.id}' already exists")
+        self._check(ext)
+        pos = len(self)
+        self._db.execute(
+            'INSERT INTO extensions VALUES (?, ?, ?, ?)',
+            (pos, ext.id, ext.__class__.__name__,
+             json.dumps(ext.to_ast())))
+        self._db.executemany(
+            'INSERT OR REPLACE INTO symbols VALUES (?, ?, ?)',
+            map(lambda t: (*t, pos), self._get_symbols(ext)))
+        self._db.executemany(
+            'INSERT INTO occurrences VALUES (?, ?, ?)',
+            map(lambda t: (*t, pos), self._get_occurrences(ext)))
+        self._cache[pos] = ext
+        return ext
+
+    def _check(self, ext):
+        if ext.is_new_type_constructor():
+            pass
+        elif ext.is_new_constant():
+            self._check_types(ext, ext[0].type)
+        elif ext.is_new_axiom():
+            self._check_types(ext, ext[1])
+        elif ext.is_new_definition():
+            l, r = ext[0]._unpack_equal()
+            self._check_types(ext, ext[0])
+            self._check_constants(ext, r, Constant(l.id, l.type))
+        elif ext.is_new_theorem():
+            for form in util.chain(ext[1].hypotheses, [ext[1].conclusion]):
+                self._check_types(ext, form)
+        elif ext.is_new_python_type_alias():
+            (_, type, spec) = ext._unpack_new_python_type_alias()
+            self._check_types(ext, type)
+            if spec is not None and not hasattr(Object.Theory, spec):
+                raise ext.error(f"undefined type alias spec '{spec}'")
+        elif ext.is_new_type_spec():
+            (spec,) = ext._unpack_new_type_spec()
+            if not hasattr(Object.Theory, spec):
+                raise ext.error(f"undefined type spec '{spec}'")
+        else:
+            error.should_not_get_here()
+
+    def _check_types(self, ext, exp):
+        tcs, _ = self._get_prelude_symbols()
+        undef = set(filter(
+            lambda x: x not in tcs
+            and self.lookup_type_constructor(x, None) is None,
+            exp.type_constructors))
+        if undef:
+            raise ext.error(error._build_plural_message(
+                'undefined type constructor%s', *undef))
+
+    def _check_constants(self, ext, term, *defined):
+        _, cts = self._get_prelude_symbols()
+        defined = {x.id: x for x in defined}
+        for c in term.constants:
+            decl = (cts.get(c.id) or defined.get(c.id)
+                    or self.lookup_constant(c.id, None))
+            if decl is None or not decl.type.matches(c.type):
+                raise ext.error(f"undefined constant '{c}'")
+
+    def _get_prelude_symbols(self):
+        if self._prelude_symbols is None:
+            thy = Object._thy()
+            exts = thy.args[:thy.prelude_offset]
+            tcs = set(map(
+                lambda x: x[0], filter(
+                    NewTypeConstructor.test, exts)))
+            cts = {x.id: self._get_symbol('constant', x) for x in exts
+                   if ('constant', x.id) in self._get_symbols(x)}
+            self._prelude_symbols = (tcs, cts)
+        return self._prelude_symbols
+
+    def _get_symbols(self, ext):
+        if ext.is_new_type_constructor():
+            yield ('type_constructor', ext.id)
+        elif ext.is_new_constant():
+            yield ('constant', ext.id)
+        elif ext.is_new_axiom():
+            yield ('constant', ext.id)
+            yield ('axiom', ext.id)
+        elif ext.is_new_definition():
+            yield ('constant', ext.id)
+            yield ('definition', ext.id)
+        elif ext.is_new_theorem():
+            yield ('constant', ext.id)
+            yield ('theorem', ext.id)
+
+    def _get_occurrences(self, ext):
+        cts, tcs = set(), set()
+        for x in filter(Expression.test, ext.args):
+            if x.is_term():
+                cts.update(map(lambda c: c.id, x.constants))
+            tcs.update(map(lambda c: c.id, x.type_constructors))
+        return util.chain(
+            map(lambda x: ('constant', x), cts),
+            map(lambda x: ('type_constructor', x), tcs))
+
+    # -- Querying extensions -----------------------------------------------
+
+    def enumerate_extensions(
+            self, *args, limit=None, offset=None, id=None, class_=None):
+        """Enumerates extensions matching criteria.
+
+        Only the extensions selected by the store indexes are
+        materialized.
+
+        Parameters:
+           args: Expressions that must occur in extension.
+           limit: Maximum number of results.
+           offset: Minimum offset.
+           id: Id (regex).
+           class_: Class.
+
+        Returns:
+           An iterator of index-:class:`Extension` pairs.
+
+        See also:
+           :meth:`Theory.enumerate_extensions`.
+        """
+        sql, params = ['SELECT pos FROM extensions WHERE pos >= ?'], [
+            offset or 0]
+        if id is not None:
+            sql.append('AND id REGEXP ?')
+            params.append(id)
+        if class_ is not None:
+            error.check_arg_is_type(
+                class_, 'enumerate_extensions', 'class_')
+            names = [x for (x,) in self._db.execute(
+                'SELECT DISTINCT class FROM extensions')
+                if issubclass(getattr(Object, x), class_)]
+            sql.append(f'AND class IN ({", ".join("?" * len(names))})')
+            params.extend(names)
+        args_cts, args_tcs = set(), set()
+        for i, arg in enumerate(args):
+            if isinstance(arg, type):
+                try:
+                    arg = Object._thy().lookup_python_type_alias(arg)
+                except LookupError:
+                    pass
+            Expression.check(arg, 'enumerate_extensions', None, i)
+            if arg.is_term():
+                args_cts.update(arg.constants)
+            args_tcs.update(arg.type_constructors)
+        for kind, xs in (
+                ('constant', args_cts), ('type_constructor', args_tcs)):
+            if xs:
+                sql.append(
+                    'AND pos IN (SELECT pos FROM occurrences WHERE kind = ? '
+                    f'AND id IN ({", ".join("?" * len(xs))}))')
+                params.append(kind)
+                params.extend(map(lambda x: x.id, xs))
+        sql.append('ORDER BY pos')
+        n = 0
+        for (pos,) in self._db.execute(' '.join(sql), params).fetchall():
+            ext = self._materialize(pos)
+            exps = list(filter(Expression.test, ext.args))
+            if args_cts and args_cts.isdisjoint(set().union(*map(
+                    lambda x: x.constants, filter(Term.test, exps)))):
+                continue        # same id, different type
+            if args_tcs and args_tcs.isdisjoint(set().union(*map(
+                    lambda x: x.type_constructors, exps))):
+                continue
+            if limit is not None and n >= limit:
+                break
+            n += 1
+            yield (pos, ext)
+
+    def _lookup(self, kind, target, arg, default):
+        id = arg.id if Object.test(arg) else arg
+        row = self._db.execute(
+            'SELECT pos FROM symbols WHERE kind = ? AND id = ?',
+            (kind, id)).fetchone()
+        if row is not None:
+            ext = self._materialize(row[0])
+            if not Object.test(arg) or arg == (
+                    ext[0] if kind == 'type_constructor'
+                    else self._get_symbol('constant', ext)):
+                return self._get_symbol(kind, ext)
+        if default is not util.Nil:
+            return default
+        raise LookupError(f"no such {target} '{arg}'")
+
+    def _get_symbol(self, kind, ext):
+        if kind == 'type_constructor':
+            return ext[0]
+        elif kind == 'theorem':
+            return ext[1]
+        elif ext.is_new_definition():
+            l, r = ext[0]._unpack_equal()
+            const = Constant(l.id, l.type)
+            if kind == 'constant':
+                return const
+            else:
+                return RuleAxiom(Object.Equal(const, r))
+        elif kind == 'constant':
+            return ext[0]
+        elif kind == 'axiom':
+            return RuleAxiom(ext[1])
+        else:
+            error.should_not_get_here()
+
+    def lookup_extension(self, arg, default=util.Nil):
+        """Searches for extension.
+
+        See :meth:`Theory.lookup_extension`.
+        """
+        row = self._db.execute(
+            'SELECT pos FROM extensions WHERE id = ?', (arg,)).fetchone()
+        if row is not None:
+            return self._materialize(row[0])
+        if default is not util.Nil:
+            return default
+        raise LookupError(f"no such extension '{arg}'")
+
+    def lookup_type_constructor(self, arg, default=util.Nil):
+        """Searches for type constructor.
+
+        See :meth:`Theory.lookup_type_constructor`.
+        """
+        return self._lookup(
+            'type_constructor', 'type constructor', arg, default)
+
+    def lookup_constant(self, arg, default=util.Nil):
+        """Searches for constant.
+
+        See :meth:`Theory.lookup_constant`.
+        """
+        return self._lookup('constant', 'constant', arg, default)
+
+    def lookup_axiom(self, arg, default=util.Nil):
+        """Searches for axiom.
+
+        See :meth:`Theory.lookup_axiom`.
+        """
+        return self._lookup('axiom', 'axiom', arg, default)
+
+    def lookup_definition(self, arg, default=util.Nil):
+        """Searches for definition.
+
+        See :meth:`Theory.lookup_definition`.
+        """
+        return self._lookup('definition', 'definition', arg, default)
+
+    def lookup_theorem(self, arg, default=util.Nil):
+        """Searches for theorem.
+
+        See :meth:`Theory.lookup_theorem`.
+        """
+        return self._lookup('theorem', 'theorem', arg, default)
+
+    # -- Conversion --------------------------------------------------------
+
+    def to_theory(self, **kwargs):
+        """Materializes the whole store into a new theory.
+
+        Parameters:
+           kwargs: Options to :class:`Theory`.
+
+        Returns:
+           :class:`Theory`.
+        """
+        return Object.Theory(*self, **kwargs)
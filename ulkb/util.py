@@ -7,7 +7,7 @@ Utility functions.
 (Not intended for external use.)
 """
 import logging
-from collections import deque
+from collections import OrderedDict, deque
 from copy import copy, deepcopy
 from functools import cmp_to_key, lru_cache, reduce, total_ordering, wraps
 from hashlib import sha256
@@ -262,6 +262,52 @@ class Proxy:
         return str(self._get_proxy())
 
 
+# -- Caching ---------------------------------------------------------------
+
+class LRUCache:
+    """Bounded mapping that discards its least recently used items.
+
+    If `maxsize` is ``None``, the mapping is unbounded.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def __contains__(self, k):
+        return k in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, k):
+        v = self._data[k]
+        self._data.move_to_end(k)
+        return v
+
+    def __setitem__(self, k, v):
+        self._data[k] = v
+        self._data.move_to_end(k)
+        if self.maxsize is not None and len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get(self, k, default=None):
+        """Gets the value of `k` (marking it as recently used); or
+        `default`."""
+        try:
+            return self[k]
+        except KeyError:
+            return default
+
+    def pop(self, k, default=None):
+        """Removes `k` and returns its value; or `default`."""
+        return self._data.pop(k, default)
+
+    def clear(self):
+        """Removes all items."""
+        self._data.clear()
+
+
 # -- Imports ---------------------------------------------------------------
 
 def get_package_data_dir(modname):